@@ -0,0 +1,133 @@
+"""Async, read-only JSON API over the venue, artist and show pages' data.
+
+Served over ASGI by asgi.py, next to the Flask app. The statements come from
+queries.py and run on an AsyncSession, so a slow client or a slow query
+parks a coroutine instead of holding a worker thread; concurrency against
+Postgres is bounded by the async engine's pool, not by the number of
+clients. Reads go to a random read replica when any are configured.
+"""
+import json
+import random
+from datetime import date, datetime
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from starlette.applications import Starlette
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+import queries
+from models import Artist, Venue
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(repr(value))
+
+
+class APIResponse(JSONResponse):
+
+    def render(self, content):
+        return json.dumps(content, default=_json_default,
+                          separators=(',', ':')).encode('utf-8')
+
+
+class Database(object):
+    """Async engines for ASYNC_DATABASE_URI or the ASYNC_REPLICA_URIS.
+
+    Engines are created on first use, inside the server's event loop.
+    """
+
+    def __init__(self, config):
+        self.urls = (config['ASYNC_REPLICA_URIS'] or
+                     [config['ASYNC_DATABASE_URI']])
+        self.options = config['ASYNC_ENGINE_OPTIONS']
+        self.engines = None
+
+    def session(self):
+        if self.engines is None:
+            self.engines = [create_async_engine(url, **self.options)
+                            for url in self.urls]
+        return AsyncSession(random.choice(self.engines))
+
+    async def dispose(self):
+        for engine in self.engines or []:
+            await engine.dispose()
+
+
+async def venues(request):
+    async with request.app.state.database.session() as session:
+        result = await session.execute(queries.venue_areas_statement())
+        return APIResponse({'areas': queries.group_areas(result.all())})
+
+
+async def show_venue(request):
+    venue_id = request.path_params['venue_id']
+    async with request.app.state.database.session() as session:
+        venue = await session.get(Venue, venue_id)
+        if venue is None or venue.deleted_at is not None:
+            raise HTTPException(404)
+        result = await session.execute(queries.venue_shows_statement(venue_id))
+        return APIResponse(queries.venue_detail(venue, result.all()))
+
+
+async def artists(request):
+    async with request.app.state.database.session() as session:
+        result = await session.execute(queries.artists_statement())
+        return APIResponse({'artists': [{
+            'id': row.id,
+            'name': row.name
+        } for row in result]})
+
+
+async def show_artist(request):
+    artist_id = request.path_params['artist_id']
+    async with request.app.state.database.session() as session:
+        artist = await session.get(Artist, artist_id)
+        if artist is None or artist.deleted_at is not None:
+            raise HTTPException(404)
+        result = await session.execute(
+            queries.artist_shows_statement(artist_id))
+        return APIResponse(queries.artist_detail(artist, result.all()))
+
+
+async def shows(request):
+    page_size = request.app.state.config['SHOWS_PER_PAGE']
+    after = request.query_params.get('after')
+    before = request.query_params.get('before')
+    try:
+        after_key = queries.decode_cursor(after)
+        before_key = queries.decode_cursor(before)
+    except ValueError:
+        raise HTTPException(400, 'Invalid page cursor.')
+    now = datetime.now()
+    async with request.app.state.database.session() as session:
+        result = await session.execute(queries.shows_page_statement(
+            after_key, before_key, page_size, now))
+        rows = result.all()
+        has_earlier = False
+        if not after and not before:
+            has_earlier = (await session.execute(
+                queries.earlier_shows_statement(now))).scalar()
+    data, pages = queries.shows_page(rows, after, before, page_size,
+                                     has_earlier)
+    return APIResponse({'shows': data, 'pages': pages})
+
+
+async def http_error(request, exc):
+    return APIResponse({'error': exc.detail}, status_code=exc.status_code)
+
+
+def create_api(config):
+    """Build the API app from a Flask config mapping (see asgi.py)."""
+    api = Starlette(routes=[
+        Route('/venues', venues),
+        Route('/venues/{venue_id:int}', show_venue),
+        Route('/artists', artists),
+        Route('/artists/{artist_id:int}', show_artist),
+        Route('/shows', shows),
+    ], exception_handlers={HTTPException: http_error})
+    api.state.config = config
+    api.state.database = Database(config)
+    return api
@@ -0,0 +1,217 @@
+from sys import exc_info
+
+from flask import (Blueprint, Response, abort, current_app, flash, jsonify,
+                   make_response, redirect, render_template, request, url_for)
+
+import deletions
+from db_routing import read_only
+from extensions import artist_index, response_cache
+from helpers import (browse_by_genre, not_modified, page_validators,
+                     refresh_name_index, search_by_name, stream_page,
+                     touch_show_partners, with_validators)
+from models import db, Artist
+import queries
+
+bp = Blueprint('artists', __name__)
+
+
+#  Artists
+#  ----------------------------------------------------------------
+@bp.route('/artists')
+@read_only
+@response_cache.cached('artists')
+def artists():
+    # DONE: replace with real data returned from querying the database
+    data = db.session.execute(queries.artists_statement()).all()
+    return stream_page('pages/artists.html', artists=data)
+
+
+@bp.route('/artists/search', methods=['GET', 'POST'])
+@read_only
+def search_artists():
+    # DONE: implement search on artists with partial string search. Ensure it is case-insensitive.
+    # seach for "A" should return "Guns N Petals", "Matt Quevado", and "The Wild Sax Band".
+    # search for "band" should return "The Wild Sax Band".
+    if request.method == 'POST':
+        return redirect(
+            url_for('.search_artists',
+                    search_term=request.form.get('search_term', '')))
+    search_term = request.args.get('search_term', '')
+    response = search_by_name(Artist, search_term,
+                              request.args.get('page', 1, type=int))
+    return render_template('pages/search_artists.html',
+                           results=response,
+                           search_term=search_term)
+
+
+@bp.route('/artists/genres/<genre>')
+@read_only
+def genre_artists(genre):
+    # e.g. /artists/genres/Jazz?state=TX
+    state = request.args.get('state') or None
+    city = request.args.get('city') or None
+    results = browse_by_genre(Artist, genre,
+                              request.args.get('page', 1, type=int), state, city)
+    return render_template('pages/genre_artists.html', results=results,
+                           genre=genre, state=state, city=city)
+
+
+@bp.route('/artists/autocomplete')
+def autocomplete_artists():
+    refresh_name_index(artist_index, Artist)
+    return jsonify(
+        artist_index.search(request.args.get('q', ''),
+                            current_app.config['AUTOCOMPLETE_LIMIT']))
+
+
+@bp.route('/artists/<int:artist_id>')
+@read_only
+def show_artist(artist_id):
+    # shows the artist page with the given artist_id
+    # DONE: replace with real artist data from the artist table, using artist_id
+    validators = page_validators(Artist, artist_id)
+    if validators is None:
+        abort(404)
+    if not_modified(*validators):
+        return with_validators(Response(status=304), *validators)
+    artist = db.session.query(Artist).get(artist_id)
+    data = queries.artist_detail(artist, db.session.execute(
+        queries.artist_shows_statement(artist_id)))
+    return with_validators(
+        make_response(render_template('pages/show_artist.html', artist=data)),
+        *validators)
+
+
+#  Update
+#  ----------------------------------------------------------------
+@bp.route('/artists/<int:artist_id>/edit', methods=['GET'])
+def edit_artist(artist_id):
+    from forms import ArtistForm
+    form = ArtistForm()
+
+    artist = Artist.query.get(artist_id)
+    if (artist is None or artist.deleted_at is not None):
+        abort(404)
+    artist_data = artist.__dict__
+    form.name.data = artist_data['name']
+    form.city.data = artist_data['city']
+    form.state.data = artist_data['state']
+    form.phone.data = artist_data['phone']
+    form.genres.data = artist_data['genres']
+    form.facebook_link.data = artist_data['facebook_link']
+    form.image_link.data = artist_data['image_link']
+    form.website_link.data = artist_data['website']
+    form.seeking_venue.data = artist_data['seeking_venue']
+    form.seeking_description.data = artist_data['seeking_description']
+
+    return render_template('forms/edit_artist.html', form=form, artist=artist)
+
+
+@bp.route('/artists/<int:artist_id>/edit', methods=['POST'])
+def edit_artist_submission(artist_id):
+    from forms import ArtistForm
+    form = ArtistForm()
+    try:
+        updated = db.session.query(Artist).filter_by(
+            id=artist_id, deleted_at=None).update(
+            dict(name=form.name.data,
+                 city=form.city.data,
+                 state=form.state.data,
+                 phone=form.phone.data,
+                 image_link=form.image_link.data,
+                 facebook_link=form.facebook_link.data,
+                 genres=form.genres.data,
+                 seeking_venue=form.seeking_venue.data,
+                 seeking_description=form.seeking_description.data,
+                 website=form.website_link.data))
+        if updated:
+            touch_show_partners(Artist, artist_id)
+            db.session.commit()
+            artist_index.add(artist_id, form.name.data)
+            response_cache.invalidate('artists', 'shows')
+            flash('Artist edited successfully')
+    except:
+        print(exc_info())
+        flash('An error occurred. Artist could not be edited')
+        db.session.rollback()
+        return redirect(url_for('.show_artist', artist_id=artist_id))
+    finally:
+        db.session.close()
+    # DONE: take values from the form submitted, and update existing
+    # artist record with ID <artist_id> using the new attributes
+
+    if not updated:
+        abort(404)
+    return redirect(url_for('.show_artist', artist_id=artist_id))
+
+
+#  Create Artist
+#  ----------------------------------------------------------------
+
+
+@bp.route('/artists/create', methods=['GET'])
+def create_artist_form():
+    from forms import ArtistForm
+    form = ArtistForm()
+    return render_template('forms/new_artist.html', form=form)
+
+
+@bp.route('/artists/create', methods=['POST'])
+def create_artist_submission():
+    from forms import ArtistForm
+    form = ArtistForm()
+    # DONE: insert form data as a new Venue record in the db, instead
+    data = Artist(name=form.name.data,
+                  city=form.city.data,
+                  state=form.state.data,
+                  phone=form.phone.data,
+                  image_link=form.image_link.data,
+                  facebook_link=form.facebook_link.data,
+                  genres=form.genres.data,
+                  seeking_venue=form.seeking_venue.data,
+                  seeking_description=form.seeking_description.data,
+                  website=form.website_link.data)
+    # DONE: modify data to be the data object returned from db insertion
+    try:
+        db.session.add(data)
+        db.session.commit()
+        artist_index.add(data.id, data.name)
+        response_cache.invalidate('artists')
+        # on successful db insert, flash success
+        flash('Artist ' + data.name + '  was successfully listed!')
+    except Exception as e:
+        print(e)
+        # e.g., flash('An error occurred. Venue ' + data.name + ' could not be listed.')
+        flash('An error occurred. Artist ' + data.name +
+              ' could not be listed.')
+        db.session.rollback()
+    finally:
+        db.session.close()
+    return redirect(url_for(".artists"))
+
+
+#  Delete Artist
+#  ----------------------------------------------------------------
+
+
+@bp.route('/artists/<int:artist_id>', methods=['DELETE'])
+def delete_artist(artist_id):
+    # Like delete_venue: hidden now, deleted in the background
+    try:
+        job = deletions.schedule(Artist, artist_id)
+        data = job and deletions.progress(job)
+        db.session.commit()
+    except:
+        db.session.rollback()
+        print(exc_info())
+        flash("Artist could not be deleted successfully.Try again later")
+        return redirect(url_for('.artists'))
+    finally:
+        db.session.close()
+    if data is None:
+        abort(404)
+    artist_index.remove(artist_id)
+    response_cache.invalidate('artists', 'shows')
+    flash("Artist: " + data['name'] + " is being deleted.")
+    return jsonify(data), 202, {
+        'Location': url_for('main.deletion_job', job_id=data['id'])}
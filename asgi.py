@@ -0,0 +1,21 @@
+"""ASGI entry point: the async read API under /api/v1, Flask for the rest.
+
+    uvicorn asgi:app --workers 4
+
+The Flask app keeps working on its own under gunicorn; here its requests
+run in a thread pool while /api/v1 is served from the event loop.
+"""
+from starlette.applications import Starlette
+from starlette.middleware.wsgi import WSGIMiddleware
+from starlette.routing import Mount
+
+from api import create_api
+from app import create_app
+
+flask_app = create_app()
+api = create_api(flask_app.config)
+
+app = Starlette(routes=[
+    Mount('/api/v1', app=api),
+    Mount('/', app=WSGIMiddleware(flask_app)),
+], on_shutdown=[api.state.database.dispose])
@@ -0,0 +1,181 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+
+from flask import request, send_from_directory, url_for
+
+BUILD_DIR = 'dist'
+MANIFEST = 'manifest.json'
+HISTORY = 'history.json'
+COMPRESSIBLE = {'.css', '.js', '.map', '.svg', '.eot', '.ttf', '.otf', '.json'}
+CSS_URL = re.compile(r'''url\(\s*(['"]?)([^'"()]+?)\1\s*\)''')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+def _fingerprint(name, data):
+    root, ext = os.path.splitext(name)
+    return '{}.{}{}'.format(root, hashlib.sha256(data).hexdigest()[:12], ext)
+
+
+def _minified(name):
+    root, ext = os.path.splitext(name)
+    return root + '.min' + ext
+
+
+def _rewrite_css(name, data, manifest):
+    """Point relative url() references in a stylesheet at fingerprinted files."""
+    base = posixpath.dirname(name)
+
+    def replace(match):
+        target = match.group(2)
+        path = re.split(r'[?#]', target, 1)[0]
+        resolved = posixpath.normpath(posixpath.join(base, path))
+        if resolved not in manifest:
+            return match.group(0)
+        relative = posixpath.relpath(manifest[resolved], base)
+        return 'url({}{})'.format(relative, target[len(path):])
+
+    return CSS_URL.sub(replace, data.decode('utf-8')).encode('utf-8')
+
+
+def _previous_builds(out_dir):
+    """Built file names of earlier builds, newest first."""
+    path = os.path.join(out_dir, HISTORY)
+    if os.path.exists(path):
+        with open(path) as handle:
+            return json.load(handle)['builds']
+    path = os.path.join(out_dir, MANIFEST)
+    if os.path.exists(path):  # built before the history was kept
+        with open(path) as handle:
+            return [sorted(set(json.load(handle).values()))]
+    return []
+
+
+def _prune(out_dir, builds):
+    """Delete built files (and their variants) that no kept build lists."""
+    kept = {MANIFEST, HISTORY}
+    for files in builds:
+        for built in files:
+            kept.update([built, built + '.gz', built + '.br'])
+    for root, dirs, files in os.walk(out_dir, topdown=False):
+        for filename in files:
+            path = os.path.join(root, filename)
+            name = os.path.relpath(path, out_dir).replace(os.sep, '/')
+            if name not in kept:
+                os.remove(path)
+        if root != out_dir and not os.listdir(root):
+            os.rmdir(root)
+
+
+def build(static_dir, keep=3):
+    """Fingerprint everything under ``static_dir`` into ``static_dir/dist``.
+
+    Each file is copied as ``name.<sha256 prefix>.ext`` with ``.gz`` (and,
+    when the brotli package is installed, ``.br``) variants for text types.
+    Where a ``.min`` sibling exists, only the minified copy is emitted and the
+    unminified name maps to it too. Stylesheets are built last so that their
+    url() references can be rewritten to fingerprinted fonts and images.
+    Returns the manifest, which is also written to ``dist/manifest.json``.
+
+    Files of the previous ``keep - 1`` builds are left in place, so pages
+    rendered or cached before a deploy can still load their assets; older
+    fingerprints are deleted. ``dist/history.json`` records each build's
+    files.
+    """
+    try:
+        import brotli
+    except ImportError:  # brotli is optional; only .gz variants are built then
+        brotli = None
+    out_dir = os.path.join(static_dir, BUILD_DIR)
+    previous = _previous_builds(out_dir)
+    names = []
+    for root, dirs, files in os.walk(static_dir):
+        dirs[:] = [d for d in dirs if d != BUILD_DIR and not d.startswith('.')]
+        for filename in files:
+            if not filename.startswith('.'):
+                path = os.path.relpath(os.path.join(root, filename), static_dir)
+                names.append(path.replace(os.sep, '/'))
+    available = set(names)
+    names = [name for name in names if _minified(name) not in available]
+    names.sort(key=lambda name: (name.endswith('.css'), name))
+
+    manifest = {}
+    for name in names:
+        with open(os.path.join(static_dir, name), 'rb') as handle:
+            data = handle.read()
+        if name.endswith('.css'):
+            data = _rewrite_css(name, data, manifest)
+        built = _fingerprint(name, data)
+        manifest[name] = built
+        target = os.path.join(out_dir, built)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'wb') as handle:
+            handle.write(data)
+        if os.path.splitext(name)[1] in COMPRESSIBLE:
+            with open(target + '.gz', 'wb') as handle:
+                handle.write(gzip.compress(data, 9, mtime=0))
+            if brotli is not None:
+                with open(target + '.br', 'wb') as handle:
+                    handle.write(brotli.compress(data))
+    for name in available - set(names):
+        manifest[name] = manifest[_minified(name)]
+
+    builds = ([sorted(set(manifest.values()))] + previous)[:max(keep, 1)]
+    with open(os.path.join(out_dir, HISTORY), 'w') as handle:
+        json.dump({'builds': builds}, handle, indent=2)
+    _prune(out_dir, builds)
+    with open(os.path.join(out_dir, MANIFEST), 'w') as handle:
+        json.dump(manifest, handle, indent=2, sort_keys=True)
+    return manifest
+
+
+class Assets(object):
+    """Serves the fingerprinted build and exposes ``asset_url`` to templates.
+
+    Without a built manifest ``asset_url`` falls back to the plain static
+    URL, so development works without running the build.
+    """
+
+    def __init__(self, app=None):
+        self.manifest = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.out_dir = os.path.join(app.static_folder, BUILD_DIR)
+        self.load()
+        app.add_url_rule(app.static_url_path + '/' + BUILD_DIR +
+                         '/<path:filename>', 'built_asset', self.send)
+        app.jinja_env.globals['asset_url'] = self.url
+
+    def load(self):
+        path = os.path.join(self.out_dir, MANIFEST)
+        if os.path.exists(path):
+            with open(path) as handle:
+                self.manifest = json.load(handle)
+
+    def url(self, name):
+        built = self.manifest.get(name)
+        if built is None:
+            return url_for('static', filename=name)
+        return url_for('built_asset', filename=built)
+
+    def send(self, filename):
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        encoding = None
+        for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+            if (request.accept_encodings[candidate] and os.path.exists(
+                    os.path.join(self.out_dir, filename + suffix))):
+                encoding, filename = candidate, filename + suffix
+                break
+        response = send_from_directory(self.out_dir, filename,
+                                       mimetype=mimetype)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Cache-Control'] = IMMUTABLE
+        return response
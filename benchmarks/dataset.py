@@ -0,0 +1,273 @@
+"""Deterministic synthetic venues, artists and shows for benchmarking.
+
+Replaces the contents of the configured database with generated rows. The
+same ``--seed`` and sizes always give the same rows; each table has its own
+random stream, so changing ``--shows`` leaves the venues and artists alone.
+Cities and genres are drawn with a Zipf-like ``--skew``, so a few of them
+dominate; venues and artists get shows with a milder ``--popularity-skew``,
+so popular ones play far more often without one venue owning the table.
+Show times are spread around ``--anchor`` (today by default). On Postgres
+the rows are loaded with COPY.
+
+    python -m benchmarks.dataset [--venues 10000] [--artists 200000]
+                                 [--shows 2000000] [--seed 1] [--skew 1.1]
+                                 [--popularity-skew 0.5]
+"""
+import argparse
+import csv
+import io
+import itertools
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+CITIES = [
+    ('New York', 'NY'), ('Los Angeles', 'CA'), ('Chicago', 'IL'),
+    ('San Francisco', 'CA'), ('Austin', 'TX'), ('Nashville', 'TN'),
+    ('Seattle', 'WA'), ('New Orleans', 'LA'), ('Boston', 'MA'),
+    ('Atlanta', 'GA'), ('Denver', 'CO'), ('Portland', 'OR'),
+    ('Philadelphia', 'PA'), ('Detroit', 'MI'), ('Minneapolis', 'MN'),
+    ('Miami', 'FL'), ('Phoenix', 'AZ'), ('Memphis', 'TN'),
+    ('Kansas City', 'MO'), ('Baltimore', 'MD'), ('Salt Lake City', 'UT'),
+    ('Pittsburgh', 'PA'), ('Cleveland', 'OH'), ('Albuquerque', 'NM'),
+    ('Omaha', 'NE'), ('Boise', 'ID'), ('Burlington', 'VT'),
+    ('Anchorage', 'AK'), ('Honolulu', 'HI'), ('Fargo', 'ND'),
+]
+# Same names as the form choices, most popular first
+GENRES = [
+    'Rock n Roll', 'Pop', 'Hip-Hop', 'Alternative', 'Electronic', 'Jazz',
+    'R&B', 'Country', 'Soul', 'Folk', 'Funk', 'Blues', 'Punk',
+    'Heavy Metal', 'Reggae', 'Classical', 'Instrumental', 'Musical Theatre',
+    'Other',
+]
+WORDS = [
+    'Blue', 'Velvet', 'Golden', 'Electric', 'Midnight', 'Crimson', 'Silver',
+    'Wild', 'Lucky', 'Hollow', 'Neon', 'Iron', 'Paper', 'Broken', 'Sunset',
+    'Copper', 'Jade', 'Lonesome', 'Northern', 'Secret', 'Stone', 'Howling',
+    'Sax', 'Moon', 'Tiger', 'Harbor', 'Petals', 'River', 'Ghost', 'Echo',
+    'Owl', 'Crow', 'Lantern', 'Garden', 'Engine', 'Mirror', 'Fox', 'Drum',
+]
+VENUE_KINDS = ['Hall', 'Bar', 'Club', 'Lounge', 'Theatre', 'Room', 'Tavern',
+               'Ballroom', 'Cellar', 'Garage']
+ARTIST_KINDS = ['Band', 'Trio', 'Quartet', 'Collective', 'Orchestra',
+                'Brothers', 'Sisters', 'Project', 'Ensemble', 'Experience']
+STREETS = ['Main', 'Market', 'Mission', 'Broadway', 'Valencia', 'Delancey',
+           'Elm', 'Oak', 'Pine', 'Maple', 'Church', 'Canal']
+
+VENUE_COLUMNS = ['id', 'name', 'city', 'state', 'address', 'phone',
+                 'image_link', 'facebook_link', 'genres', 'seeking_talent',
+                 'seeking_description', 'website', 'updated_at']
+ARTIST_COLUMNS = ['id', 'name', 'city', 'state', 'phone', 'genres',
+                  'image_link', 'facebook_link', 'website', 'seeking_venue',
+                  'seeking_description', 'updated_at']
+SHOW_COLUMNS = ['id', 'venue_id', 'artist_id', 'start_time', 'updated_at']
+
+CHUNK_ROWS = 50000
+
+
+def zipf_weights(count, skew):
+    """Cumulative weights giving rank ``i`` a share proportional to 1/i^skew."""
+    return list(itertools.accumulate(1.0 / (rank ** skew)
+                                     for rank in range(1, count + 1)))
+
+
+def _genres(rng, weights):
+    return sorted(set(rng.choices(GENRES, cum_weights=weights,
+                                  k=rng.randint(1, 3))))
+
+
+def _copy_value(value):
+    """Lists (the genres) as Postgres array literals for COPY."""
+    if isinstance(value, list):
+        return '{{{}}}'.format(','.join(
+            '"{}"'.format(item.replace('\\', '\\\\').replace('"', '\\"'))
+            for item in value))
+    return value
+
+
+def _phone(rng):
+    return '{}-{}-{}'.format(rng.randint(200, 999), rng.randint(200, 999),
+                             rng.randint(1000, 9999))
+
+
+def generate_venues(count, seed, skew, now):
+    rng = random.Random('{}:venue'.format(seed))
+    city_weights = zipf_weights(len(CITIES), skew)
+    genre_weights = zipf_weights(len(GENRES), skew)
+    for venue_id in range(1, count + 1):
+        city, state = rng.choices(CITIES, cum_weights=city_weights)[0]
+        seeking = rng.random() < 0.3
+        yield (venue_id,
+               'The {} {} {}'.format(rng.choice(WORDS), rng.choice(WORDS),
+                                     rng.choice(VENUE_KINDS)),
+               city, state,
+               '{} {} Street'.format(rng.randint(1, 2000), rng.choice(STREETS)),
+               _phone(rng),
+               'https://images.example.com/venues/{}.jpg'.format(venue_id),
+               'https://www.facebook.com/venue{}'.format(venue_id),
+               _genres(rng, genre_weights), seeking,
+               'Looking for local acts.' if seeking else '',
+               'https://venue{}.example.com'.format(venue_id), now)
+
+
+def generate_artists(count, seed, skew, now):
+    rng = random.Random('{}:artist'.format(seed))
+    city_weights = zipf_weights(len(CITIES), skew)
+    genre_weights = zipf_weights(len(GENRES), skew)
+    for artist_id in range(1, count + 1):
+        city, state = rng.choices(CITIES, cum_weights=city_weights)[0]
+        seeking = rng.random() < 0.4
+        yield (artist_id,
+               '{} {} {}'.format(rng.choice(WORDS), rng.choice(WORDS),
+                                 rng.choice(ARTIST_KINDS)),
+               city, state, _phone(rng), _genres(rng, genre_weights),
+               'https://images.example.com/artists/{}.jpg'.format(artist_id),
+               'https://www.facebook.com/artist{}'.format(artist_id),
+               'https://artist{}.example.com'.format(artist_id), seeking,
+               'Looking for a residency.' if seeking else '', now)
+
+
+def generate_shows(count, venues, artists, seed, popularity_skew, anchor,
+                   now, past_days=365, future_days=180):
+    """Shows between ``past_days`` before and ``future_days`` after anchor."""
+    rng = random.Random('{}:shows'.format(seed))
+    venue_weights = zipf_weights(venues, popularity_skew)
+    artist_weights = zipf_weights(artists, popularity_skew)
+    venue_ids = range(1, venues + 1)
+    artist_ids = range(1, artists + 1)
+    start = anchor - timedelta(days=past_days)
+    show_id = 0
+    while show_id < count:
+        size = min(CHUNK_ROWS, count - show_id)
+        for venue_id, artist_id in zip(
+                rng.choices(venue_ids, cum_weights=venue_weights, k=size),
+                rng.choices(artist_ids, cum_weights=artist_weights, k=size)):
+            show_id += 1
+            start_time = start + timedelta(
+                days=rng.randrange(past_days + future_days),
+                hours=rng.choice((18, 19, 20, 21, 22)),
+                minutes=rng.choice((0, 30)))
+            yield show_id, venue_id, artist_id, start_time, now
+
+
+def _chunks(rows, size=CHUNK_ROWS):
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def copy_rows(connection, table, columns, rows):
+    """COPY rows into a Postgres table in CHUNK_ROWS pieces."""
+    cursor = connection.cursor()
+    statement = 'COPY {} ({}) FROM STDIN WITH (FORMAT csv)'.format(
+        table, ', '.join(columns))
+    for chunk in _chunks(rows):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(
+            [_copy_value(value) for value in row] for row in chunk)
+        buffer.seek(0)
+        cursor.copy_expert(statement, buffer)
+    cursor.close()
+
+
+def insert_rows(db, table, columns, rows):
+    """Portable fallback: multi-row INSERTs through SQLAlchemy."""
+    for chunk in _chunks(rows, 5000):
+        db.session.execute(table.insert(), [dict(zip(columns, row))
+                                            for row in chunk])
+
+
+def load(db, venues, artists, shows, seed=1, skew=1.1, popularity_skew=0.5,
+         anchor=None):
+    """Replace all venues, artists and shows with a generated dataset.
+
+    Deletion jobs of the replaced rows are dropped and the show counter
+    watermark starts again from the time of the load.
+    """
+    import partitions
+    import show_counts
+    from models import Artist, DeletionJob, Show, ShowCounterState, Venue
+    now = datetime.now().replace(microsecond=0)
+    anchor = anchor or datetime.combine(now.date(), datetime.min.time())
+    tables = [
+        (Venue.__table__, VENUE_COLUMNS,
+         generate_venues(venues, seed, skew, now)),
+        (Artist.__table__, ARTIST_COLUMNS,
+         generate_artists(artists, seed, skew, now)),
+        (Show.__table__, SHOW_COLUMNS,
+         generate_shows(shows, venues, artists, seed, popularity_skew,
+                        anchor, now)),
+    ]
+    timings = {}
+    postgres = db.engine.dialect.name == 'postgresql'
+    if postgres:
+        db.session.execute(db.text(
+            'TRUNCATE shows, artist, venue, deletion_job, show_counter_state '
+            'RESTART IDENTITY'))
+        # COPY bypasses ensure_show_partition: cover generate_shows' range
+        partitions.ensure_partitions(db.session.connection(),
+                                     anchor - timedelta(days=365),
+                                     anchor + timedelta(days=180))
+    else:
+        for table in (DeletionJob.__table__, ShowCounterState.__table__):
+            db.session.execute(table.delete())
+        for table, _, _ in reversed(tables):
+            db.session.execute(table.delete())
+    for table, columns, rows in tables:
+        started = time.perf_counter()
+        if postgres:
+            copy_rows(db.session.connection().connection, table.name,
+                      columns, rows)
+            db.session.execute(db.text(
+                "SELECT setval(pg_get_serial_sequence('{0}', 'id'), "
+                "coalesce(max(id), 1)) FROM {0}".format(table.name)))
+        else:
+            insert_rows(db, table, columns, rows)
+        timings[table.name] = time.perf_counter() - started
+    db.session.commit()
+    # The rows bypass models.count_shows(), so fill the counters in one pass.
+    # With the watermark row gone, check() recreates it at the current time.
+    started = time.perf_counter()
+    show_counts.check(repair=True)
+    timings['show_counts'] = time.perf_counter() - started
+    if postgres:
+        db.session.execute(db.text('ANALYZE venue, artist, shows'))
+        db.session.commit()
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--venues', type=int, default=10000)
+    parser.add_argument('--artists', type=int, default=200000)
+    parser.add_argument('--shows', type=int, default=2000000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--skew', type=float, default=1.1)
+    parser.add_argument('--popularity-skew', type=float, default=0.5)
+    parser.add_argument('--anchor', type=datetime.fromisoformat,
+                        help='date the show times are spread around')
+    args = parser.parse_args()
+
+    from app import create_app
+    from models import db
+    with create_app().app_context():
+        timings = load(db, args.venues, args.artists, args.shows,
+                       args.seed, args.skew, args.popularity_skew,
+                       args.anchor)
+    print(json.dumps({
+        'venues': args.venues,
+        'artists': args.artists,
+        'shows': args.shows,
+        'seed': args.seed,
+        'skew': args.skew,
+        'popularity_skew': args.popularity_skew,
+        'load_seconds': timings,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Per-show cost of the `datetime` Jinja filter.
+
+Compares the original pipeline (``str()`` in the route, then
+``dateutil.parser.parse`` and ``babel.dates.format_datetime`` in the filter)
+with ``filters.format_datetime`` on datetimes, for a venue page of distinct
+start times (cold memo) and for a page re-rendered with the same times
+(warm memo).
+
+    python -m benchmarks.datetime_filter [--shows 2000] [--repeat 5]
+"""
+import argparse
+import json
+import timeit
+from datetime import datetime, timedelta
+
+import babel.dates
+import dateutil.parser
+
+import filters
+
+
+def legacy_format(value, format='full'):
+    date = dateutil.parser.parse(value)
+    return babel.dates.format_datetime(date, filters.FORMATS[format],
+                                       locale='en')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--shows', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    start = datetime(2026, 1, 2, 20, 0)
+    times = [start + timedelta(hours=7 * i) for i in range(args.shows)]
+
+    def legacy():
+        for value in times:
+            legacy_format(str(value))
+
+    def current():
+        for value in times:
+            filters.format_datetime(value, 'full')
+
+    def per_show(function, clear):
+        runs = []
+        for _ in range(args.repeat):
+            if clear:
+                filters._format.cache_clear()
+            runs.append(timeit.timeit(function, number=1))
+        return min(runs) / args.shows * 1e6
+
+    results = {
+        'shows': args.shows,
+        'legacy_us_per_show': per_show(legacy, clear=False),
+        'cold_us_per_show': per_show(current, clear=True),
+        'warm_us_per_show': per_show(current, clear=False),
+    }
+    assert legacy_format(str(start)) == filters.format_datetime(start, 'full')
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Startup budget for `import app; app.create_app()`.
+
+Runs the import in fresh interpreters under ``python -X importtime``,
+reports the packages that take longest to import and fails (exit status 1) when the
+fastest run exceeds the budget or when a module that the app is meant to
+load lazily was imported during startup. Wall-clock time varies between
+runs and machines; with ``--warn-over-budget`` going over the budget only
+prints a warning, and only the lazily loaded modules fail the check.
+
+    python -m benchmarks.import_time [--budget-ms 400] [--repeat 5]
+                                     [--warn-over-budget]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Only needed by the views, filters and commands that use them.
+DEFERRED = ['babel', 'dateutil', 'wtforms', 'flask_wtf', 'forms', 'brotli',
+            'alembic', 'flask_migrate']
+
+PROBE = '''
+import json, sys, time
+started = time.perf_counter()
+import app
+app.create_app()
+elapsed = time.perf_counter() - started
+print(json.dumps({"ms": elapsed * 1e3,
+                  "loaded": [m for m in %r if m in sys.modules]}))
+''' % (DEFERRED,)
+
+
+def parse_importtime(stderr):
+    """Return ``{top-level package: self time in us}`` from -X importtime."""
+    packages = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        own, _, name = line[len('import time:'):].split('|')
+        package = name.strip().split('.')[0]
+        packages[package] = packages.get(package, 0) + int(own)
+    return packages
+
+
+def run_once(root):
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', PROBE], cwd=root,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        universal_newlines=True, check=True)
+    probe = json.loads(result.stdout.strip().splitlines()[-1])
+    probe['imports'] = parse_importtime(result.stderr)
+    return probe
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--budget-ms', type=float, default=400)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--warn-over-budget', action='store_true',
+                        help='Warn instead of failing when over the budget.')
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    runs = [run_once(root) for _ in range(args.repeat)]
+    best = min(runs, key=lambda run: run['ms'])
+    slowest = sorted(best['imports'].items(), key=lambda item: -item[1])
+    results = {
+        'startup_ms': best['ms'],
+        'budget_ms': args.budget_ms,
+        'eagerly_loaded': best['loaded'],
+        'slowest_packages_ms': {name: us / 1e3
+                               for name, us in slowest[:args.top]},
+    }
+    print(json.dumps(results, indent=2))
+    over_budget = best['ms'] > args.budget_ms
+    if over_budget and args.warn_over_budget:
+        print('warning: startup took {:.0f} ms, over the {:.0f} ms budget'.format(
+            best['ms'], args.budget_ms), file=sys.stderr)
+    elif over_budget:
+        sys.exit(1)
+    if best['loaded']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+"""Concurrent load against the read routes of a running Fyyur server.
+
+Requests each route ``--requests`` times from ``--concurrency`` threads and
+prints, per route, p50/p95/p99 latency, throughput, error count and SQL
+statements per request as JSON, tagged with the current commit so runs can
+be compared. Paths (ids, search terms) are drawn from ``--seed`` and the
+dataset sizes, so two runs request exactly the same pages. Load the data
+with ``python -m benchmarks.dataset`` first.
+
+Statements per request come from the server's /metrics, which is per
+process: run the server with one worker (threads are fine) to get them,
+e.g. ``gunicorn -w 1 --threads 8 'app:create_app()'``.
+
+    python -m benchmarks.load [--base-url http://127.0.0.1:5000]
+                              [--concurrency 8] [--requests 200]
+                              [--route shows --route venues ...]
+"""
+import argparse
+import json
+import math
+import os
+import random
+import re
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError, URLError
+from urllib.parse import quote
+from urllib.request import urlopen
+
+from benchmarks.dataset import (ARTIST_KINDS, CITIES, GENRES, VENUE_KINDS,
+                                WORDS)
+
+
+def _search_term(rng, kinds):
+    return quote(rng.choice([rng.choice(WORDS), rng.choice(kinds),
+                             rng.choice(WORDS)[:3].lower()]))
+
+
+# route name -> (endpoint label in /metrics, path for a random number source)
+ROUTES = {
+    'venues': ('venues.venues', lambda rng, args: '/venues'),
+    'show_venue': ('venues.show_venue', lambda rng, args: '/venues/{}'.format(
+        rng.randint(1, args.venues))),
+    'search_venues': ('venues.search_venues', lambda rng, args:
+                      '/venues/search?search_term=' +
+                      _search_term(rng, VENUE_KINDS)),
+    'autocomplete_venues': ('venues.autocomplete_venues', lambda rng, args:
+                            '/venues/autocomplete?q=' +
+                            quote(rng.choice(WORDS)[:3])),
+    'genre_venues': ('venues.genre_venues', lambda rng, args:
+                     '/venues/genres/{}?state={}'.format(
+                         quote(rng.choice(GENRES)), rng.choice(CITIES)[1])),
+    'artists': ('artists.artists', lambda rng, args: '/artists'),
+    'show_artist': ('artists.show_artist', lambda rng, args:
+                    '/artists/{}'.format(rng.randint(1, args.artists))),
+    'search_artists': ('artists.search_artists', lambda rng, args:
+                       '/artists/search?search_term=' +
+                       _search_term(rng, ARTIST_KINDS)),
+    'autocomplete_artists': ('artists.autocomplete_artists', lambda rng, args:
+                             '/artists/autocomplete?q=' +
+                             quote(rng.choice(WORDS)[:3])),
+    'genre_artists': ('artists.genre_artists', lambda rng, args:
+                      '/artists/genres/' + quote(rng.choice(GENRES))),
+    'shows': ('shows.shows', lambda rng, args: '/shows'),
+}
+
+METRIC_LINE = re.compile(
+    r'^fyyur_request_queries_(sum|count)\{endpoint="([^"]+)"\} (\S+)$')
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return None
+    index = max(0, min(len(ordered) - 1,
+                       math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def fetch(url):
+    started = time.perf_counter()
+    try:
+        with urlopen(url, timeout=60) as response:
+            response.read()
+            status = response.status
+    except HTTPError as error:
+        status = error.code
+    except URLError:
+        status = None
+    return time.perf_counter() - started, status
+
+
+def query_totals(base_url):
+    """``{endpoint: (statements, requests)}`` from /metrics, or None."""
+    try:
+        with urlopen(base_url + '/metrics', timeout=10) as response:
+            text = response.read().decode('utf-8')
+    except (HTTPError, URLError):
+        return None
+    totals = {}
+    for line in text.splitlines():
+        match = METRIC_LINE.match(line)
+        if match:
+            kind, endpoint, value = match.groups()
+            statements, requests = totals.get(endpoint, (0.0, 0.0))
+            if kind == 'sum':
+                statements = float(value)
+            else:
+                requests = float(value)
+            totals[endpoint] = (statements, requests)
+    return totals
+
+
+def queries_per_request(before, after, endpoint):
+    if before is None or after is None:
+        return None
+    statements, requests = after.get(endpoint, (0.0, 0.0))
+    old_statements, old_requests = before.get(endpoint, (0.0, 0.0))
+    if requests == old_requests:
+        return None
+    return (statements - old_statements) / (requests - old_requests)
+
+
+def run_route(args, name, cache_bust):
+    endpoint, make_path = ROUTES[name]
+    rng = random.Random('{}:{}'.format(args.seed, name))
+    paths = [make_path(rng, args) for _ in range(args.requests)]
+    if cache_bust:
+        # The response cache keys on the full path
+        paths = ['{}{}_={}'.format(path, '&' if '?' in path else '?', i)
+                 for i, path in enumerate(paths)]
+    urls = [args.base_url + path for path in paths]
+    for url in urls[:args.warmup]:
+        fetch(url)
+    before = query_totals(args.base_url)
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        started = time.perf_counter()
+        results = list(pool.map(fetch, urls))
+        elapsed = time.perf_counter() - started
+    after = query_totals(args.base_url)
+    latencies = sorted(latency for latency, status in results)
+    errors = sum(1 for latency, status in results
+                 if status is None or status >= 400)
+    return {
+        'requests': len(results),
+        'errors': errors,
+        'throughput_rps': len(results) / elapsed,
+        'p50_ms': percentile(latencies, 0.50) * 1e3,
+        'p95_ms': percentile(latencies, 0.95) * 1e3,
+        'p99_ms': percentile(latencies, 0.99) * 1e3,
+        'queries_per_request': queries_per_request(before, after, endpoint),
+    }
+
+
+def current_commit():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=root,
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            universal_newlines=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--base-url', default='http://127.0.0.1:5000')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--venues', type=int, default=10000,
+                        help='venue ids are drawn from 1..VENUES')
+    parser.add_argument('--artists', type=int, default=200000,
+                        help='artist ids are drawn from 1..ARTISTS')
+    parser.add_argument('--route', action='append', choices=sorted(ROUTES),
+                        help='route to run (repeatable); default all')
+    parser.add_argument('--cache', action='store_true',
+                        help='let the response cache serve the list pages')
+    args = parser.parse_args()
+    args.base_url = args.base_url.rstrip('/')
+
+    routes = args.route or list(ROUTES)
+    results = {
+        'commit': current_commit(),
+        'base_url': args.base_url,
+        'concurrency': args.concurrency,
+        'seed': args.seed,
+        'cache': args.cache,
+        'routes': {name: run_route(args, name, cache_bust=not args.cache)
+                   for name in routes},
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,428 @@
+"""`flask` CLI commands, registered on the app by create_app()."""
+import time
+from datetime import datetime
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+import deletions
+import export
+import partitions
+import show_counts
+from extensions import response_cache, static_assets
+from main import export_statement
+from models import db, has_genre, Artist, Show, Venue
+
+
+def plan_indexes(plan):
+    """Yield every index name referenced by an EXPLAIN (FORMAT JSON) plan node."""
+    if 'Index Name' in plan:
+        yield plan['Index Name']
+    for child in plan.get('Plans', []):
+        yield from plan_indexes(child)
+
+
+def invalidate_pages(*tags):
+    """Invalidate cached pages after a command changed their data.
+
+    Only the shared Redis cache can be reached from here: with the memory
+    backend the cache lives inside each web worker, which keeps serving its
+    copy for up to RESPONSE_CACHE_TTL, so that is reported instead.
+    """
+    if response_cache.shared:
+        response_cache.invalidate(*tags)
+    else:
+        click.echo('cached {} pages refresh within {} seconds '
+                   '(RESPONSE_CACHE_TTL)'.format('/'.join(tags),
+                                                 response_cache.ttl), err=True)
+
+
+@click.command('export')
+@click.argument('kind', type=click.Choice(['venues', 'artists', 'shows']))
+@click.option('--format', type=click.Choice(sorted(export.FORMATS)),
+              default='ndjson', show_default=True)
+@click.option('--output', type=click.File('w'), default='-',
+              help='File to write to (default: stdout).')
+@with_appcontext
+def export_command(kind, format, output):
+    """Stream all venues, artists or shows as NDJSON or CSV."""
+    for chunk in export.stream_rows(db.session, export_statement(kind), format,
+                                    current_app.config['EXPORT_BATCH_SIZE']):
+        output.write(chunk)
+    db.session.rollback()
+
+
+# Form class (looked up in forms.py when an import runs), model and columns
+IMPORT_FORMS = {
+    'venues': ('VenueForm', Venue, ['name', 'city', 'state', 'address', 'phone',
+                                    'image_link', 'facebook_link', 'genres',
+                                    'seeking_talent', 'seeking_description']),
+    'artists': ('ArtistForm', Artist, ['name', 'city', 'state', 'phone',
+                                       'image_link', 'facebook_link', 'genres',
+                                       'seeking_venue', 'seeking_description']),
+}
+
+
+def resolve_references(model, references):
+    """Map each artist/venue reference (an id or a name) to an id.
+
+    All references of a batch are resolved with one query. Unknown ids and
+    unknown or ambiguous names map to None.
+    """
+    ids = {ref for ref in references if isinstance(ref, int)}
+    names = {ref for ref in references if isinstance(ref, str)}
+    if not ids and not names:
+        return {}
+    rows = db.session.query(model.id, model.name).filter(
+        db.or_(model.id.in_(ids), model.name.in_(names)),
+        model.deleted_at.is_(None)).all()
+    resolved = {row.id: row.id for row in rows if row.id in ids}
+    by_name = {}
+    for row in rows:
+        by_name.setdefault(row.name, []).append(row.id)
+    for name in names:
+        matches = by_name.get(name, [])
+        resolved[name] = matches[0] if len(matches) == 1 else None
+    return resolved
+
+
+def show_reference(record, kind):
+    """Return the ``<kind>_id`` of a show record as int, else its ``<kind>_name``."""
+    value = record.get(kind + '_id')
+    if value not in (None, ''):
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+    return record.get(kind + '_name') or None
+
+
+def import_batch(kind):
+    """Build the importer.run_import callback for ``kind``."""
+    import forms
+    import importer
+    from shows import bulk_insert_shows
+
+    def insert(batch):
+        rows, rejected = [], []
+        if kind == 'shows':
+            artists = resolve_references(
+                Artist, {show_reference(record, 'artist') for _, record in batch})
+            venues = resolve_references(
+                Venue, {show_reference(record, 'venue') for _, record in batch})
+        for line_number, record in batch:
+            if kind == 'shows':
+                start_time = record.get('start_time')
+                if isinstance(start_time, str) and 'T' in start_time:
+                    record = dict(record, start_time=start_time.replace('T', ' ')[:19])
+                form = forms.ShowForm(formdata=importer.form_data(record),
+                                      meta={'csrf': False})
+                artist_id = artists.get(show_reference(record, 'artist'))
+                venue_id = venues.get(show_reference(record, 'venue'))
+                errors = {} if form.validate() else dict(form.errors)
+                if artist_id is None:
+                    errors['artist_id'] = ['Unknown or ambiguous artist.']
+                if venue_id is None:
+                    errors['venue_id'] = ['Unknown or ambiguous venue.']
+                if errors:
+                    rejected.append((line_number, errors))
+                    continue
+                rows.append({'artist_id': artist_id, 'venue_id': venue_id,
+                             'start_time': form.start_time.data})
+            else:
+                form_name, model, columns = IMPORT_FORMS[kind]
+                form = getattr(forms, form_name)(formdata=importer.form_data(
+                    record, {'website': 'website_link'}), meta={'csrf': False})
+                if not form.validate():
+                    rejected.append((line_number, dict(form.errors)))
+                    continue
+                row = {column: form[column].data for column in columns}
+                row['website'] = form.website_link.data
+                rows.append(row)
+        if not rows:
+            return 0, rejected
+        model = Show if kind == 'shows' else IMPORT_FORMS[kind][1]
+        try:
+            # psycopg2 executemany is rendered as multi-row INSERT ... VALUES
+            if kind == 'shows':
+                bulk_insert_shows(rows)
+            else:
+                db.session.execute(model.__table__.insert(), rows)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            invalid = dict(rejected)
+            return 0, [(line_number,
+                        invalid.get(line_number, {'database': [str(e)]}))
+                       for line_number, _ in batch]
+        return len(rows), rejected
+    return insert
+
+
+@click.command('import')
+@click.argument('kind', type=click.Choice(['venues', 'artists', 'shows']))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', type=click.Choice(sorted(export.FORMATS)),
+              help='Input format (default: from the file extension).')
+@click.option('--batch-size', default=5000, show_default=True)
+@click.option('--checkpoint', 'checkpoint_path',
+              help='Resume file (default: PATH.checkpoint).')
+@click.option('--errors', 'errors_path',
+              help='Rejected-row report (default: PATH.errors.ndjson).')
+@with_appcontext
+def import_command(kind, path, format, batch_size, checkpoint_path,
+                   errors_path):
+    """Bulk-load venues, artists or shows from a CSV or NDJSON file.
+
+    Rows are validated with the same forms as the create pages and inserted
+    in one multi-row INSERT and one transaction per batch. Shows may
+    reference artists and venues by id (artist_id/venue_id) or by exact name
+    (artist_name/venue_name). An interrupted run resumes from the
+    checkpoint. Web workers pick up the new names for autocomplete on their
+    next start, and the new rows on cached list pages once the cache is
+    invalidated (Redis backend) or expires (memory backend).
+    """
+    import importer
+    checkpoint = importer.Checkpoint(checkpoint_path or path + '.checkpoint')
+    if checkpoint.done:
+        click.echo('resuming after {} records'.format(checkpoint.done))
+    with open(errors_path or path + '.errors.ndjson', 'a') as errors:
+        totals = importer.run_import(importer.read_records(path, format),
+                                     import_batch(kind), batch_size,
+                                     checkpoint, errors, click.echo)
+    invalidate_pages('venues', 'artists', 'shows')
+    click.echo('{inserted} inserted, {rejected} rejected'.format(**totals))
+
+
+@click.command('build-assets')
+@with_appcontext
+def build_assets():
+    """Fingerprint and precompress static/ into static/dist (run on each host)."""
+    import assets
+    manifest = assets.build(current_app.static_folder,
+                            current_app.config['ASSET_BUILDS_KEPT'])
+    click.echo('built {} assets into {}'.format(
+        len(set(manifest.values())), static_assets.out_dir))
+
+
+@click.command('compile-templates')
+@with_appcontext
+def compile_templates():
+    """Compile every template into the bytecode cache (run on each host).
+
+    Cache entries are keyed by the templates' absolute paths, so the cache has
+    to be filled where the app runs.
+    """
+    jinja_env = current_app.jinja_env
+    names = jinja_env.list_templates(extensions=['html'])
+    for name in names:
+        jinja_env.get_template(name)
+    click.echo('compiled {} templates into {}'.format(
+        len(names), current_app.config['JINJA_BYTECODE_CACHE_DIR']))
+
+
+def partition_indexes(connection, index):
+    """Names of the per-partition copies of ``index`` (none if unpartitioned)."""
+    return set(connection.execute(db.text(
+        'SELECT child.relname FROM pg_inherits '
+        'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+        'WHERE pg_inherits.inhparent = to_regclass(:index)'),
+        {'index': index}).scalars())
+
+
+@click.command('check-indexes')
+@with_appcontext
+def check_indexes():
+    """EXPLAIN the hot route queries and fail if they skip their index.
+
+    Sequential scans are disabled for the check so that small development
+    databases, where a seq scan is always cheapest, still report whether the
+    index is usable for the query shape.
+    """
+    like_query = '%mus%'
+    checks = [
+        ('show_venue', 'ix_shows_venue_id_start_time',
+         db.session.query(Show.start_time).filter(
+             Show.venue_id == 1).order_by(Show.start_time)),
+        ('show_artist', 'ix_shows_artist_id_start_time',
+         db.session.query(Show.start_time).filter(
+             Show.artist_id == 1).order_by(Show.start_time)),
+        ('shows', 'ix_shows_start_time_id',
+         db.session.query(Show.id).filter(
+             Show.start_time >= datetime.now()).order_by(
+                 Show.start_time, Show.id).limit(
+                     current_app.config['SHOWS_PER_PAGE'])),
+        ('venues', 'ix_venue_state_city',
+         db.session.query(Venue.id).order_by(Venue.state, Venue.city)),
+        ('search_venues', 'ix_venue_name_trgm',
+         db.session.query(Venue.id).filter(Venue.name.ilike(like_query))),
+        ('search_artists', 'ix_artist_name_trgm',
+         db.session.query(Artist.id).filter(Artist.name.ilike(like_query))),
+        ('genre_venues', 'ix_venue_genres',
+         db.session.query(Venue.id).filter(has_genre(Venue.genres, 'Jazz'))),
+        ('genre_artists', 'ix_artist_genres',
+         db.session.query(Artist.id).filter(has_genre(Artist.genres, 'Jazz'))),
+    ]
+    connection = db.session.connection()
+    connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+    failed = False
+    for route, index, query in checks:
+        compiled = query.statement.compile(dialect=connection.dialect)
+        plan = connection.exec_driver_sql(
+            'EXPLAIN (FORMAT JSON) ' + str(compiled),
+            compiled.params).scalar()
+        used = set(plan_indexes(plan[0]['Plan']))
+        if used & ({index} | partition_indexes(connection, index)):
+            click.echo('ok      {:<16} {}'.format(route, index))
+        else:
+            failed = True
+            click.echo('MISSING {:<16} {} (plan used: {})'.format(
+                route, index, ', '.join(sorted(used)) or 'no index'))
+    db.session.rollback()
+    if failed:
+        raise SystemExit(1)
+
+
+@click.command('roll-show-counts')
+@click.option('--every', type=float,
+              help='Keep running, rolling over every EVERY seconds.')
+@with_appcontext
+def roll_show_counts(every):
+    """Move shows that have started from the upcoming to the past counts.
+
+    Run it from cron, or as a clock process with --every; several copies at
+    once are safe. Cached /venues pages show the new counts once invalidated
+    (Redis backend) or expired (memory backend). See show_counts.py.
+    """
+    while True:
+        moved = show_counts.roll_over()
+        if moved:
+            invalidate_pages('venues')
+        click.echo('{} {} shows moved to past'.format(
+            datetime.now().isoformat(timespec='seconds'), moved))
+        if not every:
+            break
+        time.sleep(every)
+
+
+@click.command('check-show-counts')
+@click.option('--repair', is_flag=True, help='Rewrite the drifted counters.')
+@with_appcontext
+def check_show_counts(repair):
+    """Recount shows per venue and artist and report (or repair) drift.
+
+    Exits with status 1 when drift is found and not repaired. Repaired
+    counts reach cached list pages as described in invalidate_pages().
+    """
+    report = show_counts.check(repair=repair)
+    for table, rows in report.items():
+        for row in rows:
+            click.echo('{} {}: upcoming {} -> {}, past {} -> {}'.format(
+                table, row.id, row.upcoming_show_count, row.upcoming,
+                row.past_show_count, row.past))
+    total = sum(len(rows) for rows in report.values())
+    if total and repair:
+        invalidate_pages('venues', 'artists')
+    click.echo('{} drifted rows{}'.format(total, ' repaired' if repair else ''))
+    if total and not repair:
+        raise SystemExit(1)
+
+
+@click.command('run-deletions')
+@click.option('--every', type=float,
+              help='Keep running, looking for new deletions every EVERY '
+                   'seconds.')
+@click.option('--batch-size', type=int,
+              help='Shows deleted per transaction (default: '
+                   'DELETION_BATCH_SIZE).')
+@with_appcontext
+def run_deletions(every, batch_size):
+    """Delete the venues and artists scheduled for deletion, in batches.
+
+    Run it as a clock process with --every; several copies share the
+    queue. The batches change the partners' show counts on /venues, which
+    cached pages pick up as described in invalidate_pages(). See
+    deletions.py.
+    """
+    batch_size = batch_size or current_app.config['DELETION_BATCH_SIZE']
+    while True:
+        job = deletions.run_next(batch_size)
+        deleted = job is not None
+        while job is not None:
+            click.echo('{} {} {}: {}/{} shows deleted{}'.format(
+                datetime.now().isoformat(timespec='seconds'), job.entity,
+                job.entity_id, job.deleted_shows, job.total_shows,
+                ', done' if job.finished_at else ''))
+            job = deletions.run_next(batch_size)
+        if deleted:
+            invalidate_pages('venues')
+        if not every:
+            break
+        time.sleep(every)
+
+
+@click.command('create-show-partitions')
+@click.option('--months-ahead', type=int,
+              help='Months to create ahead of the current one '
+                   '(default: SHOW_PARTITION_MONTHS_AHEAD).')
+@with_appcontext
+def create_show_partitions(months_ahead):
+    """Create the missing monthly partitions of shows (run it daily)."""
+    if months_ahead is None:
+        months_ahead = current_app.config['SHOW_PARTITION_MONTHS_AHEAD']
+    now = datetime.now()
+    created = partitions.ensure_partitions(
+        db.session.connection(), now,
+        partitions.add_months(partitions.month_floor(now), months_ahead))
+    db.session.commit()
+    for name in created:
+        click.echo('created {}'.format(name))
+    click.echo('{} partitions created'.format(len(created)))
+
+
+@click.command('archive-show-partitions')
+@click.option('--before', type=click.DateTime(['%Y-%m-%d']),
+              help='Archive the months ending on or before this date '
+                   '(default: SHOW_PARTITION_RETENTION_MONTHS ago).')
+@click.option('--drop', is_flag=True,
+              help='Drop the old partitions instead of keeping them in the '
+                   'archive schema.')
+@with_appcontext
+def archive_show_partitions(before, drop):
+    """Detach old monthly partitions of shows into the archive schema.
+
+    Archived shows no longer appear on any page and are taken off the past
+    show counts; cached list pages follow as described in
+    invalidate_pages(). Each month is archived in its own transaction: writes
+    to that month wait while its shows are counted, and all of shows is
+    blocked, reads included, only from its DETACH to its commit.
+    """
+    if before is None:
+        before = partitions.add_months(
+            partitions.month_floor(datetime.now()),
+            -current_app.config['SHOW_PARTITION_RETENTION_MONTHS'])
+    months = partitions.archivable_months(db.session.connection(), before)
+    db.session.commit()
+    archived = []
+    for month in months:
+        archived.append(partitions.archive_partition(
+            db.session.connection(), month, drop=drop,
+            schema=current_app.config['SHOW_ARCHIVE_SCHEMA']))
+        db.session.commit()
+    if archived:
+        invalidate_pages('venues', 'artists', 'shows')
+    for name in archived:
+        click.echo('{} {}'.format('dropped' if drop else 'archived', name))
+    click.echo('{} partitions {}'.format(
+        len(archived), 'dropped' if drop else 'archived'))
+
+
+COMMANDS = [export_command, import_command, build_assets, compile_templates,
+            check_indexes, roll_show_counts, check_show_counts, run_deletions,
+            create_show_partitions, archive_show_partitions]
+
+
+def init_app(app):
+    for command in COMMANDS:
+        app.cli.add_command(command)
@@ -0,0 +1,71 @@
+import random
+import time
+
+from flask import current_app, g, has_request_context, request, session
+from flask_sqlalchemy import SignallingSession, SQLAlchemy
+from sqlalchemy import orm
+
+
+def read_only(view):
+    """Mark a view as safe to serve from a read replica on GET/HEAD."""
+    view.read_only = True
+    return view
+
+
+class RoutingSession(SignallingSession):
+    """Session that sends reads of read-only requests to a replica bind.
+
+    Everything else (writes, flushes, requests that are not marked read-only
+    and requests from a client that committed recently) uses the primary.
+    """
+
+    def __init__(self, db, **options):
+        self._db = db
+        SignallingSession.__init__(self, db, **options)
+
+    def get_bind(self, mapper=None, clause=None):
+        if (not self._flushing and has_request_context()
+                and g.get('replica_bind')):
+            return self._db.get_engine(self.app, bind=g.replica_bind)
+        return SignallingSession.get_bind(self, mapper, clause)
+
+    def commit(self):
+        SignallingSession.commit(self)
+        if has_request_context():
+            # Read-your-writes: keep this client on the primary for a while so
+            # the redirect after a POST does not read a lagging replica.
+            session['last_write'] = time.time()
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    """SQLAlchemy extension routing read-only requests to replica binds.
+
+    Replicas are the binds listed in ``SQLALCHEMY_REPLICA_BINDS``; one is
+    picked at random per request. ``READ_YOUR_WRITES_SECONDS`` controls how
+    long a client stays on the primary after committing.
+    """
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+    def init_app(self, app):
+        SQLAlchemy.init_app(self, app)
+        app.before_request(self._choose_bind)
+        if app.config.get('DB_ROUTING_DEBUG_HEADER'):
+            app.after_request(self._bind_header)
+
+    def _choose_bind(self):
+        config = current_app.config
+        replicas = config.get('SQLALCHEMY_REPLICA_BINDS')
+        view = current_app.view_functions.get(request.endpoint)
+        recent_write = (time.time() - session.get('last_write', 0) <
+                        config.get('READ_YOUR_WRITES_SECONDS', 5))
+        if (replicas and request.method in ('GET', 'HEAD')
+                and getattr(view, 'read_only', False) and not recent_write):
+            g.replica_bind = random.choice(replicas)
+        else:
+            g.replica_bind = None
+
+    def _bind_header(self, response):
+        response.headers['X-Database-Bind'] = g.get('replica_bind') or 'primary'
+        return response
@@ -0,0 +1,99 @@
+"""Background deletion of venues and artists.
+
+Deleting a venue or artist row directly removes all its shows through
+ON DELETE CASCADE in one statement, holding their row locks until it
+commits and stalling show writes meanwhile. Instead, schedule() only marks
+the row ``deleted_at``, which hides it everywhere, and queues a
+DeletionJob. `flask run-deletions --every 5` then deletes its shows
+DELETION_BATCH_SIZE at a time, one short transaction per batch, and the row
+itself once no show is left.
+"""
+from datetime import datetime
+
+from helpers import touch_show_partners, uncount_entity_shows
+from models import count_shows, db, Artist, DeletionJob, Show, Venue
+
+MODELS = {model.__tablename__: model for model in (Venue, Artist)}
+
+
+def schedule(model, entity_id):
+    """Hide an Artist/Venue and queue the deletion of it and its shows.
+
+    Returns the DeletionJob (flushed, so it has its id), or None if there
+    is no such row or it is already being deleted. Does not commit.
+    """
+    entity = db.session.query(model).filter(
+        model.id == entity_id,
+        model.deleted_at.is_(None)).with_for_update().first()
+    if entity is None:
+        return None
+    entity.deleted_at = datetime.now()
+    # Their pages stop listing the entity's shows now
+    touch_show_partners(model, entity.id)
+    job = DeletionJob(
+        entity=model.__tablename__, entity_id=entity.id, name=entity.name,
+        total_shows=db.session.query(db.func.count(Show.id)).filter(
+            getattr(Show, model._show_key) == entity.id).scalar())
+    db.session.add(job)
+    db.session.flush()
+    return job
+
+
+def delete_batch(job, batch_size):
+    """Delete up to ``batch_size`` shows of the job's entity.
+
+    The shows come off the show counters in the same transaction. Once the
+    entity has no show left, its row is deleted and the job finished.
+    Commits.
+    """
+    model = MODELS[job.entity]
+    shows = db.session.execute(db.select(
+        [Show.id, Show.venue_id, Show.artist_id, Show.start_time]).where(
+            getattr(Show, model._show_key) == job.entity_id).order_by(
+                Show.id).limit(batch_size).with_for_update()).all()
+    if shows:
+        count_shows(db.session, [(show.venue_id, show.artist_id,
+                                  show.start_time) for show in shows], sign=-1)
+        # The start_time range lets Postgres prune the shows partitions
+        db.session.execute(Show.__table__.delete().where(db.and_(
+            Show.id.in_([show.id for show in shows]),
+            Show.start_time.between(min(show.start_time for show in shows),
+                                    max(show.start_time for show in shows)))))
+        job.deleted_shows += len(shows)
+    if len(shows) < batch_size:
+        # Shows added since the last batch go with the row
+        uncount_entity_shows(model, job.entity_id)
+        db.session.query(model).filter(model.id == job.entity_id).delete(
+            synchronize_session=False)
+        job.finished_at = datetime.now()
+    db.session.commit()
+
+
+def run_next(batch_size):
+    """Run one batch of the oldest unfinished deletion.
+
+    Jobs being run by another process are skipped, so several workers can
+    share the queue. Returns the job, or None when there is nothing to do.
+    """
+    job = db.session.query(DeletionJob).filter(
+        DeletionJob.finished_at.is_(None)).order_by(
+            DeletionJob.id).with_for_update(skip_locked=True).first()
+    if job is None:
+        db.session.rollback()
+        return None
+    delete_batch(job, batch_size)
+    return job
+
+
+def progress(job):
+    return {
+        'id': job.id,
+        'entity': job.entity,
+        'entity_id': job.entity_id,
+        'name': job.name,
+        'total_shows': job.total_shows,
+        'deleted_shows': job.deleted_shows,
+        'created_at': job.created_at.isoformat(),
+        'finished_at': job.finished_at and job.finished_at.isoformat(),
+        'done': job.finished_at is not None,
+    }
@@ -0,0 +1,60 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(repr(value))
+
+
+def _csv_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (list, dict)):
+        return json.dumps(value)
+    return value
+
+
+def _ndjson_chunks(columns, batches):
+    for batch in batches:
+        yield ''.join(
+            json.dumps(dict(zip(columns, row)), default=_json_default) + '\n'
+            for row in batch)
+
+
+def _csv_chunks(columns, batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue()
+    for batch in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_csv_value(value) for value in row] for row in batch)
+        yield buffer.getvalue()
+
+
+def stream_rows(session, statement, format, batch_size=1000):
+    """Yield ``statement``'s rows serialized as NDJSON or CSV text chunks.
+
+    The statement runs on a server-side cursor and rows are fetched
+    ``batch_size`` at a time, one output chunk per batch, so memory stays
+    constant however large the table is. The CSV header goes out before the
+    first fetch.
+    """
+    result = session.execute(
+        statement.execution_options(stream_results=True,
+                                    max_row_buffer=batch_size))
+    columns = list(result.keys())
+    batches = result.partitions(batch_size)
+    if format == 'csv':
+        return _csv_chunks(columns, batches)
+    return _ndjson_chunks(columns, batches)
@@ -0,0 +1,52 @@
+"""Flask extensions, created unbound and initialised in create_app()."""
+from assets import Assets
+from metrics import Metrics
+from response_cache import ResponseCache
+from search_index import PrefixIndex
+
+
+class LazyMigrate(object):
+    """Flask-Migrate, imported the first time `flask db` needs it.
+
+    flask_migrate pulls in alembic and mako, which a web worker never uses,
+    so init_app only leaves a placeholder in ``app.extensions['migrate']``
+    that sets up the real extension on first attribute access (from the
+    `flask db` commands or migrations/env.py).
+    """
+
+    def init_app(self, app, db, **kwargs):
+        app.extensions['migrate'] = _PendingMigrate(app, db, kwargs)
+
+
+class _PendingMigrate(object):
+
+    def __init__(self, app, db, kwargs):
+        self.app = app
+        self.db = db
+        self.kwargs = kwargs
+        self._config = None
+
+    def __getattr__(self, name):
+        if self._config is None:
+            from flask_migrate import Migrate
+            Migrate(self.app, self.db, **self.kwargs)
+            self._config = self.app.extensions['migrate']
+        return getattr(self._config, name)
+
+
+migrate = LazyMigrate()
+
+# Name indexes behind the autocomplete endpoints, one copy per process; filled
+# on the first request, updated by this process's create/edit/delete handlers
+# and caught up with other processes' writes by helpers.refresh_name_index().
+venue_index = PrefixIndex()
+artist_index = PrefixIndex()
+
+# Whole-page cache for the list pages, invalidated by the write handlers.
+response_cache = ResponseCache()
+
+# Fingerprinted, precompressed static files (see `flask build-assets`).
+static_assets = Assets()
+
+# Prometheus metrics served at /metrics.
+metrics = Metrics()
@@ -7,7 +7,7 @@ from fabric.contrib.console import confirm
 def test():
     with settings(warn_only=True):
         result = local(
-            "python test_tasks.py -v && python test_users.py -v", capture=True
+            "python -m unittest discover -p 'test_*.py' -v", capture=True
         )
     if result.failed and not confirm("Tests failed. Continue?"):
         abort("Aborted at user request.")
@@ -27,6 +27,21 @@ def prepare():
     commit()
     push()
 
+
+def check_import_time():
+    # Timing varies between runs, so only eagerly imported modules stop a deploy
+    local("python -m benchmarks.import_time --warn-over-budget")
+
+
+def compile_templates():
+    # .jinja_cache is not committed; the Procfile fills it on every dyno
+    local("flask compile-templates")
+
+
+def build_assets():
+    # static/dist is not committed; the Procfile builds it on every dyno
+    local("flask build-assets")
+
 # deploy to heroku
 
 
@@ -40,13 +55,14 @@ def heroku():
 
 def heroku_test():
     local(
-        "heroku run python test_tasks.py -v && heroku run python test_users.py -v"
+        "heroku run python -m unittest discover -p 'test_*.py' -v"
     )
 
 
 def deploy():
     pull()
     test()
+    check_import_time()
     commit()
     heroku()
     heroku_test()
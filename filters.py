@@ -0,0 +1,41 @@
+from datetime import datetime
+from functools import lru_cache
+
+# Named formats accepted by the `datetime` Jinja filter
+FORMATS = {
+    'full': "EEEE MMMM, d, y 'at' h:mma",
+    'medium': "EE MM, dd, y h:mma",
+}
+
+
+# babel is imported and the named patterns are parsed on the first render,
+# not at import, so workers and CLI commands that never format a show time
+# do not pay for them.
+@lru_cache(maxsize=None)
+def _pattern(format):
+    from babel.dates import parse_pattern
+    return parse_pattern(FORMATS.get(format, format))
+
+
+@lru_cache(maxsize=1)
+def _locale():
+    from babel import Locale
+    return Locale.parse('en')
+
+
+@lru_cache(maxsize=4096)
+def _format(value, format):
+    return _pattern(format).apply(value, _locale())
+
+
+def format_datetime(value, format='medium'):
+    """Render a show time; ``format`` is 'full', 'medium' or a babel pattern.
+
+    ``value`` is normally a datetime straight from the database. Strings are
+    still parsed for older callers. Output is memoized per (value, format),
+    since list pages repeat the same start times many times.
+    """
+    if not isinstance(value, datetime):
+        import dateutil.parser
+        value = dateutil.parser.parse(value)
+    return _format(value, format)
@@ -1,7 +1,7 @@
 from datetime import datetime
 from flask_wtf import Form
-from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, BooleanField
-from wtforms.validators import DataRequired, AnyOf, URL
+from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, DateField, BooleanField
+from wtforms.validators import DataRequired, AnyOf, URL, Optional
 
 class ShowForm(Form):
     artist_id = StringField(
@@ -15,6 +15,30 @@ class ShowForm(Form):
         validators=[DataRequired()],
         default= datetime.today()
     )
+    repeat = SelectField(
+        'repeat', default='once',
+        choices=[
+            ('once', 'Does not repeat'),
+            ('daily', 'Daily'),
+            ('weekly', 'Weekly'),
+            ('monthly', 'Monthly'),
+        ]
+    )
+    weekdays = SelectMultipleField(
+        'weekdays', validators=[Optional()],
+        choices=[
+            ('MO', 'Monday'),
+            ('TU', 'Tuesday'),
+            ('WE', 'Wednesday'),
+            ('TH', 'Thursday'),
+            ('FR', 'Friday'),
+            ('SA', 'Saturday'),
+            ('SU', 'Sunday'),
+        ]
+    )
+    until = DateField(
+        'until', validators=[Optional()]
+    )
 
 class VenueForm(Form):
     name = StringField(
@@ -0,0 +1,208 @@
+from datetime import datetime, timedelta, timezone
+
+from flask import (Response, current_app, get_flashed_messages, request,
+                   session, stream_with_context)
+
+from models import count_shows, db, has_genre, Artist, Show, Venue
+
+
+def stream_page(template_name, **context):
+    """Render a template as a streamed response, like render_template.
+
+    Output is flushed every TEMPLATE_STREAM_BUFFER template chunks, so the
+    first bytes of a long list page go out before the rest is rendered.
+    Flashed messages are read up front, because the session cookie is
+    written before the body streams.
+    """
+    get_flashed_messages()
+    current_app.update_template_context(context)
+    stream = current_app.jinja_env.get_template(template_name).stream(context)
+    stream.enable_buffering(current_app.config['TEMPLATE_STREAM_BUFFER'])
+    return Response(stream_with_context(stream))
+
+
+def refresh_name_index(index, model, rebuild=False):
+    """Catch a name index up with writes made by other processes.
+
+    Runs at most every AUTOCOMPLETE_REFRESH_SECONDS, so other workers' new,
+    renamed and deleted names show up within that time. It reads the rows
+    updated since the last refresh, plus one interval of overlap for
+    transactions that committed late. With ``rebuild``, or the first time,
+    every name is read.
+    """
+    interval = timedelta(
+        seconds=current_app.config['AUTOCOMPLETE_REFRESH_SECONDS'])
+    started = datetime.now()
+    if rebuild or index.refreshed_at is None:
+        index.rebuild(db.session.query(model.id, model.name).filter(
+            model.deleted_at.is_(None)))
+    elif started - index.refreshed_at < interval:
+        return
+    else:
+        rows = db.session.query(model.id, model.name, model.deleted_at).filter(
+            model.updated_at > index.refreshed_at - interval)
+        index.apply((row.id, row.name if row.deleted_at is None else None)
+                    for row in rows)
+    index.refreshed_at = started
+
+
+def touch_show_partners(model, entity_id):
+    """Bump updated_at on every Artist/Venue sharing a show with the entity.
+
+    Their detail pages render the entity's name and image, so an edit or a
+    cascading delete has to change their validators as well.
+    """
+    partner = Artist if model is Venue else Venue
+    partner_ids = db.select([getattr(Show, partner._show_key)]).where(
+        getattr(Show, model._show_key) == entity_id)
+    db.session.query(partner).filter(partner.id.in_(partner_ids)).update(
+        {partner.updated_at: datetime.now()}, synchronize_session=False)
+
+
+def uncount_entity_shows(model, entity_id):
+    """Take an Artist/Venue's shows off the show counters before deleting it.
+
+    The shows go with it through ON DELETE CASCADE, which the Show mapper
+    events never see. Like touch_show_partners, this bumps the partners'
+    updated_at.
+    """
+    partner_key = 'artist_id' if model is Venue else 'venue_id'
+    shows = db.session.execute(db.select(
+        [getattr(Show, partner_key), Show.start_time]).where(
+            getattr(Show, model._show_key) == entity_id)).all()
+    # The entity's own counters go with its row
+    count_shows(db.session, [
+        (None, partner_id, start_time) if model is Venue else
+        (partner_id, None, start_time) for partner_id, start_time in shows
+    ], sign=-1)
+
+
+def page_validators(model, entity_id):
+    """Return the (etag, last_modified) pair of a venue/artist detail page.
+
+    The page changes when the entity (or a show on it) is updated and when a
+    show moves from upcoming to past, so Last-Modified is the later of
+    ``updated_at`` and the most recent show start that has already passed.
+    Both come from one indexed lookup. The ETag carries that time to the
+    microsecond, so an edit within the same second still changes it;
+    Last-Modified has HTTP's whole seconds. Returns None if the entity is
+    missing or being deleted.
+    """
+    last_started = db.select([db.func.max(Show.start_time)]).where(
+        db.and_(getattr(Show, model._show_key) == model.id,
+                Show.start_time <= datetime.now())).scalar_subquery()
+    row = db.session.query(model.updated_at, last_started).filter(
+        model.id == entity_id, model.deleted_at.is_(None)).first()
+    if row is None:
+        return None
+    changed = max(filter(None, row)).astimezone(timezone.utc)
+    etag = '{}-{}-{:%Y%m%d%H%M%S%f}'.format(model.__tablename__, entity_id,
+                                            changed)
+    return etag, changed.replace(microsecond=0)
+
+
+def not_modified(etag, last_modified):
+    """True when the request's validators still match the page.
+
+    Requests with pending flashed messages always get a full page, since the
+    flash is rendered into the layout.
+    """
+    if '_flashes' in session:
+        return False
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    since = request.if_modified_since
+    if since is None:
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified <= since
+
+
+def with_validators(response, etag, last_modified):
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.cache_control.no_cache = True
+    return response
+
+
+def escape_like(term):
+    """Escape LIKE wildcards so user input only matches literally."""
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def search_by_name(model, search_term, page=1):
+    """Case-insensitive, ranked and paginated name search over Venue/Artist.
+
+    Exact matches rank first, then names starting with the term, then names
+    with a word starting with it, then any other substring match. The page,
+    the total match count (as a window aggregate) and each hit's stored
+    upcoming show count come back in a single statement. A page past the end
+    costs a second statement to count the matches.
+    """
+    page_size = current_app.config['SEARCH_RESULTS_PER_PAGE']
+    page = max(page, 1)
+    term = search_term.strip()
+    escaped = escape_like(term)
+    rank = db.case(
+        [(db.func.lower(model.name) == term.lower(), 0),
+         (model.name.ilike(escaped + '%', escape='\\'), 1),
+         (model.name.ilike('% ' + escaped + '%', escape='\\'), 2)],
+        else_=3).label('rank')
+    matched = (model.name.ilike('%' + escaped + '%', escape='\\'),
+               model.deleted_at.is_(None))
+    rows = db.session.query(
+        model.id, model.name, model.upcoming_show_count,
+        db.func.count().over().label('total')).filter(*matched).order_by(
+            rank, model.name, model.id).limit(page_size).offset(
+                (page - 1) * page_size).all()
+    return result_page(rows, page, page_size,
+                       db.session.query(model.id).filter(*matched))
+
+
+def browse_by_genre(model, genre, page=1, state=None, city=None):
+    """Paginated Venue/Artist listing of one genre, optionally in one area.
+
+    The genre filter is answered from the genres GIN index on Postgres
+    (combined with ix_venue_state_city for venues in a state). Like
+    search_by_name, the page and the total come back in one statement, and a
+    page past the end counts the matches separately.
+    """
+    page_size = current_app.config['GENRE_RESULTS_PER_PAGE']
+    page = max(page, 1)
+    matched = [has_genre(model.genres, genre), model.deleted_at.is_(None)]
+    if state:
+        matched.append(model.state == state)
+    if city:
+        matched.append(model.city == city)
+    rows = db.session.query(
+        model.id, model.name, model.upcoming_show_count,
+        db.func.count().over().label('total')).filter(*matched).order_by(
+            model.name, model.id).limit(page_size).offset(
+                (page - 1) * page_size).all()
+    return result_page(rows, page, page_size,
+                       db.session.query(model.id).filter(*matched))
+
+
+def result_page(rows, page, page_size, matched):
+    """Shape rows carrying id, name, upcoming_show_count and total.
+
+    An empty page after the first one has no row to carry the total, so it is
+    counted with ``matched``, the query for every match.
+    """
+    if rows:
+        total = rows[0].total
+    elif page > 1:
+        total = matched.order_by(None).count()
+    else:
+        total = 0
+    return {
+        'count': total,
+        'page': page,
+        'pages': (total + page_size - 1) // page_size,
+        'data': [{
+            'id': row.id,
+            'name': row.name,
+            'num_upcoming_shows': row.upcoming_show_count,
+        } for row in rows]
+    }
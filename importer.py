@@ -0,0 +1,125 @@
+import csv
+import json
+import os
+
+from werkzeug.datastructures import MultiDict
+
+# CSV columns that ``flask export`` writes as JSON lists
+LIST_COLUMNS = frozenset(['genres'])
+
+
+def read_list(value):
+    """Decode a JSON list cell, keeping the text of anything that is not one."""
+    try:
+        decoded = json.loads(value)
+    except ValueError:
+        return value
+    return decoded if isinstance(decoded, list) else value
+
+
+def read_records(path, format=None):
+    """Yield ``(line_number, record)`` pairs from a CSV or NDJSON file.
+
+    The format defaults to the file extension. The CSV columns in
+    LIST_COLUMNS hold JSON lists (as written by ``flask export``) and are
+    decoded; every other cell is kept as text, even one starting with ``[``.
+    """
+    format = format or os.path.splitext(path)[1].lstrip('.').lower()
+    with open(path, newline='') as handle:
+        if format == 'csv':
+            for line_number, record in enumerate(csv.DictReader(handle), 2):
+                yield line_number, {
+                    key: read_list(value) if key in LIST_COLUMNS else value
+                    for key, value in record.items() if value is not None
+                }
+        else:
+            for line_number, line in enumerate(handle, 1):
+                if line.strip():
+                    yield line_number, json.loads(line)
+
+
+def form_data(record, field_map=None):
+    """Turn an import record into WTForms form data.
+
+    ``field_map`` renames record keys to form field names (``website`` ->
+    ``website_link``). Lists become repeated keys, and false booleans are left
+    out, the same as an unticked checkbox.
+    """
+    field_map = field_map or {}
+    data = MultiDict()
+    for key, value in record.items():
+        key = field_map.get(key, key)
+        if isinstance(value, list):
+            for item in value:
+                data.add(key, item)
+        elif value is True:
+            data.add(key, 'y')
+        elif value is None or value is False or (
+                isinstance(value, str) and value.lower() in ('false', '0', 'no')):
+            continue
+        else:
+            data.add(key, str(value))
+    return data
+
+
+class Checkpoint(object):
+    """Records how many input records are committed, so a rerun can resume."""
+
+    def __init__(self, path):
+        self.path = path
+        self.done = 0
+        if os.path.exists(path):
+            with open(path) as handle:
+                self.done = json.load(handle)['records']
+
+    def save(self, done):
+        self.done = done
+        temporary = self.path + '.tmp'
+        with open(temporary, 'w') as handle:
+            json.dump({'records': done}, handle)
+        os.replace(temporary, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def run_import(records, insert_batch, batch_size, checkpoint, errors, echo):
+    """Feed ``records`` to ``insert_batch`` in batches of ``batch_size``.
+
+    ``insert_batch`` receives a list of ``(line_number, record)`` pairs, commits
+    whatever is valid in one transaction and returns ``(inserted, rejected)``,
+    where ``rejected`` is a list of ``(line_number, errors)``. Rejections are
+    written to ``errors`` as NDJSON, and the checkpoint advances after every
+    batch. Records already covered by the checkpoint are skipped.
+    """
+    done = checkpoint.done
+    batch, seen = [], 0
+    totals = {'inserted': 0, 'rejected': 0}
+
+    def flush(batch_number):
+        inserted, rejected = insert_batch(batch)
+        for line_number, reason in rejected:
+            errors.write(json.dumps({'line': line_number,
+                                     'errors': reason}) + '\n')
+        totals['inserted'] += inserted
+        totals['rejected'] += len(rejected)
+        checkpoint.save(seen)
+        echo('batch {}: {} inserted, {} rejected'.format(
+            batch_number, inserted, len(rejected)))
+
+    batch_number = 0
+    for item in records:
+        seen += 1
+        if seen <= done:
+            continue
+        batch.append(item)
+        if len(batch) >= batch_size:
+            batch_number += 1
+            flush(batch_number)
+            batch = []
+    if batch:
+        batch_number += 1
+        flush(batch_number)
+    checkpoint.clear()
+    return totals
@@ -0,0 +1,96 @@
+from flask import (Blueprint, Response, abort, current_app, jsonify,
+                   render_template, stream_with_context)
+
+import deletions
+import export
+from db_routing import read_only
+from extensions import metrics, response_cache
+from models import db, Artist, DeletionJob, Show, Venue
+
+bp = Blueprint('main', __name__)
+
+
+def export_statement(kind):
+    """SELECT behind the bulk export of ``kind`` (venues, artists or shows)."""
+    if kind == 'venues':
+        return db.select([
+            Venue.id, Venue.name, Venue.city, Venue.state, Venue.address,
+            Venue.phone, Venue.genres, Venue.image_link, Venue.facebook_link,
+            Venue.website, Venue.seeking_talent, Venue.seeking_description
+        ]).where(Venue.deleted_at.is_(None)).order_by(Venue.id)
+    if kind == 'artists':
+        return db.select([
+            Artist.id, Artist.name, Artist.city, Artist.state, Artist.phone,
+            Artist.genres, Artist.image_link, Artist.facebook_link,
+            Artist.website, Artist.seeking_venue, Artist.seeking_description
+        ]).where(Artist.deleted_at.is_(None)).order_by(Artist.id)
+    if kind == 'shows':
+        return db.select([
+            Show.id, Show.start_time, Show.venue_id,
+            Venue.name.label('venue_name'), Show.artist_id,
+            Artist.name.label('artist_name')
+        ]).select_from(
+            Show.__table__.join(Venue.__table__,
+                                Show.venue_id == Venue.id).join(
+                                    Artist.__table__,
+                                    Show.artist_id == Artist.id)).where(
+                                        Venue.deleted_at.is_(None),
+                                        Artist.deleted_at.is_(None)).order_by(
+                                            Show.id)
+    return None
+
+
+@bp.route('/')
+def index():
+    return render_template('pages/home.html')
+
+
+#  Export
+#  ----------------------------------------------------------------
+
+
+@bp.route('/export/<kind>.<format>')
+@read_only
+def export_data(kind, format):
+    statement = export_statement(kind)
+    if statement is None or format not in export.FORMATS:
+        abort(404)
+    chunks = export.stream_rows(db.session, statement, format,
+                                current_app.config['EXPORT_BATCH_SIZE'])
+    response = Response(stream_with_context(chunks),
+                        mimetype=export.FORMATS[format])
+    response.headers['Content-Disposition'] = (
+        'attachment; filename={}.{}'.format(kind, format))
+    return response
+
+
+@bp.route('/cache/stats')
+def cache_stats():
+    return jsonify(response_cache.stats())
+
+
+#  Background deletions
+#  ----------------------------------------------------------------
+
+
+@bp.route('/deletions/<int:job_id>')
+def deletion_job(job_id):
+    job = db.session.query(DeletionJob).get(job_id)
+    if job is None:
+        abort(404)
+    return jsonify(deletions.progress(job))
+
+
+@bp.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render(),
+                    mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+
+@bp.app_errorhandler(404)
+def not_found_error(error):
+    return render_template('errors/404.html'), 404
+
+@bp.app_errorhandler(500)
+def server_error(error):
+    return render_template('errors/500.html'), 500
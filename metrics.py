@@ -0,0 +1,298 @@
+import time
+from threading import Lock
+
+from flask import current_app, g, has_request_context, request
+from jinja2 import Template
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10)
+
+
+def _escape(value):
+    return (str(value).replace('\\', '\\\\').replace('"', '\\"')
+            .replace('\n', '\\n'))
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join('{}="{}"'.format(name, _escape(value))
+                          for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter(object):
+    """Monotonic counter, one series per combination of label values."""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            yield self.name, _format_labels(self.labelnames, labels), value
+
+
+class Histogram(object):
+    """Cumulative histogram with fixed upper bounds, as Prometheus expects."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(),
+                 buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets) + (float('inf'),)
+        self._series = {}
+        self._lock = Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+
+    def samples(self):
+        with self._lock:
+            series = sorted((labels, (list(counts), total))
+                            for labels, (counts, total) in self._series.items())
+        for labels, (counts, total) in series:
+            for bound, count in zip(self.buckets, counts):
+                yield (self.name + '_bucket',
+                       _format_labels(self.labelnames, labels,
+                                      [('le', _format_value(bound))]),
+                       count)
+            label_text = _format_labels(self.labelnames, labels)
+            yield self.name + '_sum', label_text, total
+            yield self.name + '_count', label_text, counts[-1]
+
+
+class RequestStats(object):
+    """Statements a single request ran, collected by the engine events."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.status = 500
+        self.queries = 0
+        self.db_time = 0.0
+        self.shapes = {}
+
+    def record(self, statement, elapsed):
+        self.queries += 1
+        self.db_time += elapsed
+        self.shapes[statement] = self.shapes.get(statement, 0) + 1
+
+
+def request_stats():
+    """The current request's RequestStats, or None outside a request."""
+    if has_request_context():
+        return g.get('request_stats')
+    return None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                           executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    started = conn.info['query_started'].pop()
+    stats = request_stats()
+    if stats is not None:
+        stats.record(statement, time.perf_counter() - started)
+
+
+def _discard_query_start(context):
+    # after_cursor_execute does not fire for a failed statement
+    connection = context.connection
+    started = connection is not None and connection.info.get('query_started')
+    if started:
+        started.pop()
+
+
+def _timed_pool_class(histogram):
+    class TimedQueuePool(QueuePool):
+        """QueuePool reporting how long each checkout took, waits included."""
+
+        def connect(self):
+            started = time.perf_counter()
+            try:
+                return QueuePool.connect(self)
+            finally:
+                histogram.observe((), time.perf_counter() - started)
+
+    return TimedQueuePool
+
+
+def _timed_template_class(histogram):
+    class TimedTemplate(Template):
+        """Template reporting its render time, streamed renders included.
+
+        Only top-level renders are timed; extended and included templates
+        count towards the page that pulls them in.
+        """
+
+        def render(self, *args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return Template.render(self, *args, **kwargs)
+            finally:
+                histogram.observe((self.name,), time.perf_counter() - started)
+
+        def generate(self, *args, **kwargs):
+            # Time spent rendering chunks, not waiting on the client between them
+            elapsed = 0.0
+            chunks = Template.generate(self, *args, **kwargs)
+            while True:
+                started = time.perf_counter()
+                try:
+                    chunk = next(chunks)
+                except StopIteration:
+                    break
+                finally:
+                    elapsed += time.perf_counter() - started
+                yield chunk
+            histogram.observe((self.name,), elapsed)
+
+    return TimedTemplate
+
+
+class Metrics(object):
+    """Request, database and template metrics in the Prometheus text format.
+
+    Per-endpoint latency, SQL statement count and DB time per request come
+    from request hooks and SQLAlchemy engine events; pool checkout waits and
+    template render times from instrumented pool and template classes. With
+    ``N_PLUS_ONE_WARNINGS`` on, a request that runs the same statement more
+    than ``N_PLUS_ONE_THRESHOLD`` times is logged as a likely N+1. Series are
+    per process, like the response cache counters.
+    """
+
+    def __init__(self, app=None):
+        self.request_latency = Histogram(
+            'fyyur_request_duration_seconds',
+            'Time to serve a request, streamed bodies included.',
+            ('endpoint', 'method'))
+        self.requests = Counter(
+            'fyyur_requests_total', 'Requests served.',
+            ('endpoint', 'method', 'status'))
+        self.request_queries = Histogram(
+            'fyyur_request_queries', 'SQL statements run by a request.',
+            ('endpoint',), QUERY_BUCKETS)
+        self.request_db_time = Histogram(
+            'fyyur_request_db_seconds', 'Time a request spent in SQL.',
+            ('endpoint',))
+        self.pool_checkout = Histogram(
+            'fyyur_db_pool_checkout_seconds',
+            'Time to check a connection out of the pool.',
+            buckets=POOL_WAIT_BUCKETS)
+        self.template_render = Histogram(
+            'fyyur_template_render_seconds', 'Time to render a page template.',
+            ('template',))
+        self.n_plus_one = Counter(
+            'fyyur_n_plus_one_total',
+            'Requests that repeated one statement more than the threshold.',
+            ('endpoint',))
+        self.collectors = [
+            self.request_latency, self.requests, self.request_queries,
+            self.request_db_time, self.pool_checkout, self.template_render,
+            self.n_plus_one
+        ]
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        if not app.config.get('METRICS_ENABLED', True):
+            return
+        if not event.contains(Engine, 'before_cursor_execute',
+                              _before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute',
+                         _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+            event.listen(Engine, 'handle_error', _discard_query_start)
+        # Engines are created on first use, so this reaches every bind.
+        # SQLite keeps its own pools (an in-memory database lives in one
+        # connection).
+        options = app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {}
+        uri = app.config.get('SQLALCHEMY_DATABASE_URI') or ''
+        if 'poolclass' not in options and not uri.startswith('sqlite'):
+            app.config['SQLALCHEMY_ENGINE_OPTIONS'] = dict(
+                options, poolclass=_timed_pool_class(self.pool_checkout))
+        app.jinja_env.template_class = _timed_template_class(
+            self.template_render)
+        app.before_request(self._start_request)
+        app.after_request(self._record_status)
+        app.teardown_request(self._finish_request)
+
+    def _start_request(self):
+        g.request_stats = RequestStats()
+
+    def _record_status(self, response):
+        stats = request_stats()
+        if stats is not None:
+            stats.status = response.status_code
+        return response
+
+    def _finish_request(self, exc):
+        # Teardown runs once a streamed body is exhausted, so the latency and
+        # statement counts cover the whole response.
+        stats = g.pop('request_stats', None)
+        if stats is None:
+            return
+        endpoint = request.endpoint or 'unmatched'
+        self.request_latency.observe((endpoint, request.method),
+                                     time.perf_counter() - stats.started)
+        self.requests.inc((endpoint, request.method, str(stats.status)))
+        self.request_queries.observe((endpoint,), stats.queries)
+        self.request_db_time.observe((endpoint,), stats.db_time)
+        config = current_app.config
+        threshold = config.get('N_PLUS_ONE_THRESHOLD', 10)
+        repeated = [(count, statement)
+                    for statement, count in stats.shapes.items()
+                    if count > threshold]
+        if repeated:
+            self.n_plus_one.inc((endpoint,))
+            if config.get('N_PLUS_ONE_WARNINGS'):
+                count, statement = max(repeated)
+                current_app.logger.warning(
+                    'Possible N+1 in %s %s: statement ran %d times: %s',
+                    request.method, request.path, count,
+                    ' '.join(statement.split())[:300])
+
+    def render(self):
+        lines = []
+        for collector in self.collectors:
+            lines.append('# HELP {} {}'.format(collector.name,
+                                               collector.documentation))
+            lines.append('# TYPE {} {}'.format(collector.name, collector.kind))
+            for name, labels, value in collector.samples():
+                lines.append('{}{} {}'.format(name, labels,
+                                              _format_value(value)))
+        return '\n'.join(lines) + '\n'
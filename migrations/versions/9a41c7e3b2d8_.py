@@ -0,0 +1,57 @@
+"""add indexes for shows, venue and artist hot paths
+
+Revision ID: 9a41c7e3b2d8
+Revises: 5b2aed94ced5
+Create Date: 2026-10-18 10:12:41.305118
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '9a41c7e3b2d8'
+down_revision = '5b2aed94ced5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction, so the
+    # indexes are built in an autocommit block and do not block writes.
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    with op.get_context().autocommit_block():
+        op.create_index('ix_shows_venue_id_start_time', 'shows',
+                        ['venue_id', 'start_time'],
+                        postgresql_concurrently=True)
+        op.create_index('ix_shows_artist_id_start_time', 'shows',
+                        ['artist_id', 'start_time'],
+                        postgresql_concurrently=True)
+        op.create_index('ix_shows_start_time_id', 'shows',
+                        ['start_time', 'id'],
+                        postgresql_concurrently=True)
+        op.create_index('ix_venue_state_city', 'venue', ['state', 'city'],
+                        postgresql_concurrently=True)
+        op.create_index('ix_venue_name_trgm', 'venue', ['name'],
+                        postgresql_using='gin',
+                        postgresql_ops={'name': 'gin_trgm_ops'},
+                        postgresql_concurrently=True)
+        op.create_index('ix_artist_name_trgm', 'artist', ['name'],
+                        postgresql_using='gin',
+                        postgresql_ops={'name': 'gin_trgm_ops'},
+                        postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_artist_name_trgm', table_name='artist',
+                      postgresql_concurrently=True)
+        op.drop_index('ix_venue_name_trgm', table_name='venue',
+                      postgresql_concurrently=True)
+        op.drop_index('ix_venue_state_city', table_name='venue',
+                      postgresql_concurrently=True)
+        op.drop_index('ix_shows_start_time_id', table_name='shows',
+                      postgresql_concurrently=True)
+        op.drop_index('ix_shows_artist_id_start_time', table_name='shows',
+                      postgresql_concurrently=True)
+        op.drop_index('ix_shows_venue_id_start_time', table_name='shows',
+                      postgresql_concurrently=True)
@@ -0,0 +1,39 @@
+"""add deleted_at to venue and artist, and the deletion_job queue
+
+Revision ID: b2c6e9f4d817
+Revises: f4a7c2e8b619
+Create Date: 2026-10-18 17:41:09.562381
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b2c6e9f4d817'
+down_revision = 'f4a7c2e8b619'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('venue', sa.Column('deleted_at', sa.DateTime(),
+                                     nullable=True))
+    op.add_column('artist', sa.Column('deleted_at', sa.DateTime(),
+                                      nullable=True))
+    op.create_table('deletion_job',
+                    sa.Column('id', sa.Integer(), nullable=False),
+                    sa.Column('entity', sa.String(length=20), nullable=False),
+                    sa.Column('entity_id', sa.Integer(), nullable=False),
+                    sa.Column('name', sa.String(), nullable=True),
+                    sa.Column('total_shows', sa.Integer(), nullable=False),
+                    sa.Column('deleted_shows', sa.Integer(), nullable=False),
+                    sa.Column('created_at', sa.DateTime(), nullable=False),
+                    sa.Column('finished_at', sa.DateTime(), nullable=True),
+                    sa.PrimaryKeyConstraint('id'))
+
+
+def downgrade():
+    op.drop_table('deletion_job')
+    op.drop_column('artist', 'deleted_at')
+    op.drop_column('venue', 'deleted_at')
@@ -0,0 +1,47 @@
+"""store venue and artist genres as an array with a GIN index
+
+Revision ID: c5e1a9d7f263
+Revises: b2c6e9f4d817
+Create Date: 2026-10-18 19:08:33.870214
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e1a9d7f263'
+down_revision = 'b2c6e9f4d817'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # ALTER COLUMN ... USING cannot run a subquery, so the arrays are filled
+    # into a new column. Rewrites both tables: run it in a maintenance window.
+    for table in ('venue', 'artist'):
+        op.execute('ALTER TABLE {} ADD COLUMN genre_names varchar[]'.format(
+            table))
+        op.execute("""
+            UPDATE {} SET genre_names = ARRAY(
+                SELECT json_array_elements_text(genres))
+            WHERE json_typeof(genres) = 'array'
+        """.format(table))
+        op.execute('ALTER TABLE {} DROP COLUMN genres'.format(table))
+        op.execute('ALTER TABLE {} RENAME COLUMN genre_names TO genres'.format(
+            table))
+    with op.get_context().autocommit_block():
+        op.create_index('ix_venue_genres', 'venue', ['genres'],
+                        postgresql_using='gin', postgresql_concurrently=True)
+        op.create_index('ix_artist_genres', 'artist', ['genres'],
+                        postgresql_using='gin', postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_artist_genres', table_name='artist',
+                      postgresql_concurrently=True)
+        op.drop_index('ix_venue_genres', table_name='venue',
+                      postgresql_concurrently=True)
+    for table in ('venue', 'artist'):
+        op.execute('ALTER TABLE {} ALTER COLUMN genres TYPE json '
+                   'USING array_to_json(genres)'.format(table))
@@ -0,0 +1,30 @@
+"""add updated_at to venue, artist and shows
+
+Revision ID: d3f8a2c61e47
+Revises: 9a41c7e3b2d8
+Create Date: 2026-10-18 11:02:17.884310
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3f8a2c61e47'
+down_revision = '9a41c7e3b2d8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # now() is stable, so Postgres 11+ adds these columns without rewriting
+    # the tables; existing rows take the migration time as their version.
+    for table in ('venue', 'artist', 'shows'):
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(),
+                                       server_default=sa.text('now()'),
+                                       nullable=False))
+
+
+def downgrade():
+    for table in ('shows', 'artist', 'venue'):
+        op.drop_column(table, 'updated_at')
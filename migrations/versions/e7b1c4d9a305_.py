@@ -0,0 +1,52 @@
+"""add upcoming/past show counters to venue and artist
+
+Revision ID: e7b1c4d9a305
+Revises: d3f8a2c61e47
+Create Date: 2026-10-18 14:26:51.203117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7b1c4d9a305'
+down_revision = 'd3f8a2c61e47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('venue', 'artist'):
+        op.add_column(table, sa.Column('upcoming_show_count', sa.Integer(),
+                                       server_default='0', nullable=False))
+        op.add_column(table, sa.Column('past_show_count', sa.Integer(),
+                                       server_default='0', nullable=False))
+    op.create_table('show_counter_state',
+                    sa.Column('id', sa.Integer(), nullable=False),
+                    sa.Column('rolled_to', sa.DateTime(), nullable=False),
+                    sa.PrimaryKeyConstraint('id'))
+    op.execute("INSERT INTO show_counter_state (id, rolled_to) "
+               "VALUES (1, localtimestamp)")
+    # Shows written by the previous release while this runs are picked up by
+    # `flask check-show-counts --repair` after the deploy.
+    for table, key in (('venue', 'venue_id'), ('artist', 'artist_id')):
+        op.execute("""
+            UPDATE {table} SET upcoming_show_count = counts.upcoming,
+                               past_show_count = counts.past
+            FROM (SELECT shows.{key} AS entity_id,
+                         count(*) FILTER (WHERE start_time > state.rolled_to)
+                             AS upcoming,
+                         count(*) FILTER (WHERE start_time <= state.rolled_to)
+                             AS past
+                  FROM shows, show_counter_state AS state
+                  GROUP BY shows.{key}) AS counts
+            WHERE {table}.id = counts.entity_id
+        """.format(table=table, key=key))
+
+
+def downgrade():
+    op.drop_table('show_counter_state')
+    for table in ('artist', 'venue'):
+        op.drop_column(table, 'past_show_count')
+        op.drop_column(table, 'upcoming_show_count')
@@ -0,0 +1,97 @@
+"""partition shows by month on start_time
+
+Revision ID: f4a7c2e8b619
+Revises: e7b1c4d9a305
+Create Date: 2026-10-18 16:02:17.448930
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4a7c2e8b619'
+down_revision = 'e7b1c4d9a305'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_shows_venue_id_start_time', 'venue_id, start_time'),
+    ('ix_shows_artist_id_start_time', 'artist_id, start_time'),
+    ('ix_shows_start_time_id', 'start_time, id'),
+]
+
+COLUMNS = '''
+    id integer NOT NULL DEFAULT nextval('shows_id_seq'),
+    venue_id integer REFERENCES venue (id)
+        ON UPDATE CASCADE ON DELETE CASCADE,
+    artist_id integer REFERENCES artist (id)
+        ON UPDATE CASCADE ON DELETE CASCADE,
+    start_time timestamp without time zone NOT NULL,
+    updated_at timestamp without time zone NOT NULL DEFAULT now()
+'''
+
+
+def replace_shows(create, *prepare):
+    """Swap shows for a new table built by ``create``, keeping ids and rows.
+
+    ``prepare`` statements run between creating the table and filling it.
+
+    Rewrites the whole table under an ACCESS EXCLUSIVE lock: run it in a
+    maintenance window.
+    """
+    op.execute('ALTER TABLE shows RENAME TO shows_old')
+    op.execute('ALTER TABLE shows_old RENAME CONSTRAINT shows_pkey '
+               'TO shows_old_pkey')
+    for name, _ in INDEXES:
+        op.execute('DROP INDEX IF EXISTS {}'.format(name))
+    op.execute('ALTER SEQUENCE shows_id_seq OWNED BY NONE')
+    op.execute(create)
+    for statement in prepare:
+        op.execute(statement)
+    op.execute('INSERT INTO shows (id, venue_id, artist_id, start_time, '
+               'updated_at) SELECT id, venue_id, artist_id, start_time, '
+               'updated_at FROM shows_old')
+    op.execute('DROP TABLE shows_old')
+    op.execute('ALTER SEQUENCE shows_id_seq OWNED BY shows.id')
+    for name, columns in INDEXES:
+        # On the partitioned table this creates one index per partition
+        op.execute('CREATE INDEX {} ON shows ({})'.format(name, columns))
+    op.execute('ANALYZE shows')
+
+
+def upgrade():
+    # Every show needs a start_time to have a partition; fails here, before
+    # anything is changed, if one does not.
+    op.execute('ALTER TABLE shows ALTER COLUMN start_time SET NOT NULL')
+    # The partition key has to be part of the primary key.
+    replace_shows(
+        'CREATE TABLE shows ({}, PRIMARY KEY (id, start_time)) '
+        'PARTITION BY RANGE (start_time)'.format(COLUMNS),
+        # One partition per month holding a show, and the year ahead
+        """
+        DO $$
+        DECLARE
+            month timestamp;
+        BEGIN
+            FOR month IN SELECT generate_series(
+                    date_trunc('month', coalesce(min(start_time),
+                                                 localtimestamp)),
+                    date_trunc('month', greatest(
+                        max(start_time), localtimestamp + interval '12 months')),
+                    interval '1 month')
+                FROM shows_old
+            LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF shows '
+                    'FOR VALUES FROM (%L) TO (%L)',
+                    to_char(month, '"shows_"YYYY_MM'),
+                    month, month + interval '1 month');
+            END LOOP;
+        END $$
+        """)
+
+
+def downgrade():
+    # Archived partitions are not brought back.
+    replace_shows('CREATE TABLE shows ({}, PRIMARY KEY (id))'.format(COLUMNS))
+    op.execute('ALTER TABLE shows ALTER COLUMN start_time DROP NOT NULL')
@@ -0,0 +1,292 @@
+from datetime import datetime
+
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.sql.expression import FunctionElement
+
+from db_routing import RoutingSQLAlchemy
+
+# Bound to the application in create_app()
+db = RoutingSQLAlchemy()
+
+# Genre names of a venue/artist: a text array with a GIN index on Postgres
+# (migration c5e1a9d7f263), JSON elsewhere; a list of names either way
+Genres = db.JSON().with_variant(ARRAY(db.String), 'postgresql')
+
+
+class has_genre(FunctionElement):
+    """``has_genre(Venue.genres, 'Jazz')``: the row lists the genre.
+
+    On Postgres this is an array containment the GIN index answers.
+    """
+    name = 'has_genre'
+    type = db.Boolean()
+    inherit_cache = True
+
+
+@compiles(has_genre)
+def _has_genre_json(element, compiler, **kw):
+    genres, genre = element.clauses
+    return 'EXISTS (SELECT 1 FROM json_each({}) WHERE value = {})'.format(
+        compiler.process(genres, **kw), compiler.process(genre, **kw))
+
+
+@compiles(has_genre, 'postgresql')
+def _has_genre_array(element, compiler, **kw):
+    genres, genre = element.clauses
+    return '{} @> ARRAY[CAST({} AS VARCHAR)]'.format(
+        compiler.process(genres, **kw), compiler.process(genre, **kw))
+
+
+class ShowScheduleMixin(object):
+    """Upcoming/past shows and show counters shared by Venue and Artist.
+
+    The ``upcoming_shows``/``past_shows`` hybrids filter the loaded ``shows``
+    collection on instances and render as correlated EXISTS at class level,
+    e.g. ``Artist.query.filter(Artist.upcoming_shows)``. The show counts are
+    denormalized columns kept by count_shows() and show_counts.roll_over(),
+    so list pages read them as plain integers, e.g. ``Venue.query.order_by(
+    Venue.upcoming_show_count.desc())``. ``_show_key`` names the ``Show``
+    foreign key pointing at the model.
+    """
+
+    _show_key = None
+
+    upcoming_show_count = db.Column(db.Integer, nullable=False, default=0,
+                                    server_default='0')
+    past_show_count = db.Column(db.Integer, nullable=False, default=0,
+                                server_default='0')
+
+    @classmethod
+    def _shows_clause(cls, upcoming):
+        now = datetime.now()
+        key = getattr(Show, cls._show_key) == cls.id
+        if upcoming:
+            return db.and_(key, Show.start_time > now)
+        return db.and_(key, Show.start_time < now)
+
+    @hybrid_property
+    def upcoming_shows(self):
+        now = datetime.now()
+        return [show for show in self.shows if show.start_time > now]
+
+    @upcoming_shows.expression
+    def upcoming_shows(cls):
+        return db.exists().where(cls._shows_clause(upcoming=True))
+
+    @hybrid_property
+    def past_shows(self):
+        now = datetime.now()
+        return [show for show in self.shows if show.start_time < now]
+
+    @past_shows.expression
+    def past_shows(cls):
+        return db.exists().where(cls._shows_clause(upcoming=False))
+
+
+class Venue(ShowScheduleMixin, db.Model):
+    __tablename__ = 'venue'
+    __table_args__ = (
+        db.Index('ix_venue_state_city', 'state', 'city'),
+        db.Index('ix_venue_name_trgm', 'name', postgresql_using='gin',
+                 postgresql_ops={'name': 'gin_trgm_ops'}),
+        db.Index('ix_venue_genres', 'genres', postgresql_using='gin'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String)
+    city = db.Column(db.String(120))
+    state = db.Column(db.String(120))
+    address = db.Column(db.String(120))
+    phone = db.Column(db.String(120))
+    image_link = db.Column(db.String(500))
+    facebook_link = db.Column(db.String(120))
+    genres = db.Column(Genres)
+    seeking_talent = db.Column(db.Boolean())
+    seeking_description = db.Column(db.String)
+    website = db.Column(db.String)
+    updated_at = db.Column(db.DateTime(), nullable=False,
+                           default=datetime.now, onupdate=datetime.now,
+                           server_default=db.func.now())
+    # Set when the venue is scheduled for deletion (see deletions.py); it is
+    # hidden from then on and its row goes once its shows are deleted
+    deleted_at = db.Column(db.DateTime())
+
+    _show_key = 'venue_id'
+
+
+class Artist(ShowScheduleMixin, db.Model):
+    __tablename__ = 'artist'
+    __table_args__ = (
+        db.Index('ix_artist_name_trgm', 'name', postgresql_using='gin',
+                 postgresql_ops={'name': 'gin_trgm_ops'}),
+        db.Index('ix_artist_genres', 'genres', postgresql_using='gin'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String)
+    city = db.Column(db.String(120))
+    state = db.Column(db.String(120))
+    phone = db.Column(db.String(120))
+    genres = db.Column(Genres)
+    image_link = db.Column(db.String(500))
+    facebook_link = db.Column(db.String(120))
+    website = db.Column(db.String)
+    seeking_venue = db.Column(db.Boolean())
+    seeking_description = db.Column(db.String)
+    updated_at = db.Column(db.DateTime(), nullable=False,
+                           default=datetime.now, onupdate=datetime.now,
+                           server_default=db.func.now())
+    # See Venue.deleted_at
+    deleted_at = db.Column(db.DateTime())
+
+    _show_key = 'artist_id'
+
+
+class Show(db.Model):
+    __tablename__ = 'shows'
+    __table_args__ = (
+        db.Index('ix_shows_venue_id_start_time', 'venue_id', 'start_time'),
+        db.Index('ix_shows_artist_id_start_time', 'artist_id', 'start_time'),
+        db.Index('ix_shows_start_time_id', 'start_time', 'id'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    venue_id = db.Column(db.Integer,db.ForeignKey('venue.id',onupdate='CASCADE', ondelete='CASCADE'))
+    artist_id = db.Column(db.Integer,db.ForeignKey('artist.id',onupdate='CASCADE', ondelete='CASCADE'))
+    # On Postgres the table is partitioned by month on start_time (migration
+    # f4a7c2e8b619, see partitions.py); its primary key there is
+    # (id, start_time), id alone is still unique.
+    start_time = db.Column(db.DateTime(), nullable=False)
+    updated_at = db.Column(db.DateTime(), nullable=False,
+                           default=datetime.now, onupdate=datetime.now,
+                           server_default=db.func.now())
+
+    artist = db.relationship("Artist", backref=db.backref("shows", lazy=True))
+    venue = db.relationship("Venue", backref=db.backref("shows", lazy=True))
+
+
+class DeletionJob(db.Model):
+    """A venue or artist being deleted in the background, see deletions.py.
+
+    ``entity`` is the table name of the deleted row. ``total_shows`` is
+    counted when the deletion is scheduled and ``deleted_shows`` grows with
+    every batch; ``finished_at`` is set once the row itself is gone.
+    """
+    __tablename__ = 'deletion_job'
+
+    id = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(20), nullable=False)
+    entity_id = db.Column(db.Integer, nullable=False)
+    name = db.Column(db.String)
+    total_shows = db.Column(db.Integer, nullable=False, default=0)
+    deleted_shows = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime(), nullable=False, default=datetime.now)
+    finished_at = db.Column(db.DateTime())
+
+
+class ShowCounterState(db.Model):
+    """Single row holding the time the show counters are rolled over to.
+
+    Shows starting after ``rolled_to`` count as upcoming, the others as past;
+    show_counts.roll_over() advances it.
+    """
+    __tablename__ = 'show_counter_state'
+    id = db.Column(db.Integer, primary_key=True)
+    rolled_to = db.Column(db.DateTime(), nullable=False)
+
+
+def show_counter_watermark(connection, exclusive=False):
+    """Return ``rolled_to``, locking its row until the transaction ends.
+
+    Writers take a shared lock, so a roll-over (which takes it exclusively)
+    never runs between a writer reading the watermark and committing shows
+    counted against it. ``connection`` is a Connection or a Session.
+    """
+    if not isinstance(connection, Connection):
+        connection = connection.connection()
+    if connection.dialect.name == 'postgresql':
+        # Every path locks shows before the watermark (writers hold it from
+        # their INSERT, partition DDL takes it exclusively), so they cannot
+        # deadlock each other.
+        connection.execute(db.text(
+            'LOCK TABLE {} IN ACCESS SHARE MODE'.format(Show.__tablename__)))
+    table = ShowCounterState.__table__
+    row = connection.execute(db.select([table.c.rolled_to]).where(
+        table.c.id == 1).with_for_update(read=not exclusive)).first()
+    if row is None:
+        rolled_to = datetime.now()
+        connection.execute(table.insert().values(id=1, rolled_to=rolled_to))
+        return rolled_to
+    return row.rolled_to
+
+
+def count_shows(connection, shows, sign=1):
+    """Add (``sign=1``) or remove (``sign=-1``) shows from the show counters.
+
+    ``shows`` are ``(venue_id, artist_id, start_time)`` triples. Each venue
+    and artist involved gets one counter update, batched into one statement
+    per table, which also bumps its updated_at since both pages list the
+    show. Rows are updated in id order, venues before artists, so that
+    concurrent writers lock them in the same order. Does not commit.
+    """
+    if not shows:
+        return
+    rolled_to = show_counter_watermark(connection)
+    now = datetime.now()
+    for model, position in ((Venue, 0), (Artist, 1)):
+        deltas = {}
+        for show in shows:
+            if show[position] is None:
+                continue
+            delta = deltas.setdefault(show[position], [0, 0])
+            upcoming = show[2] is not None and show[2] > rolled_to
+            delta[0 if upcoming else 1] += sign
+        if not deltas:
+            continue
+        table = model.__table__
+        connection.execute(table.update().where(
+            table.c.id == db.bindparam('entity_id')).values(
+                upcoming_show_count=table.c.upcoming_show_count +
+                db.bindparam('upcoming'),
+                past_show_count=table.c.past_show_count + db.bindparam('past'),
+                updated_at=now), [{
+                    'entity_id': entity_id,
+                    'upcoming': upcoming,
+                    'past': past
+                } for entity_id, (upcoming, past) in sorted(deltas.items())])
+
+
+def _show_values(show, previous=False):
+    state = db.inspect(show)
+    values = []
+    for name in ('venue_id', 'artist_id', 'start_time'):
+        history = state.attrs[name].history
+        if previous and history.deleted:
+            values.append(history.deleted[0])
+        else:
+            values.append(getattr(show, name))
+    return tuple(values)
+
+
+# A show appears on both its venue's and its artist's page, so any change to
+# it updates their counters and bumps their updated_at (the pages' validators).
+@db.event.listens_for(Show, 'after_insert')
+def count_inserted_show(mapper, connection, show):
+    count_shows(connection, [_show_values(show)])
+
+
+@db.event.listens_for(Show, 'after_delete')
+def uncount_deleted_show(mapper, connection, show):
+    count_shows(connection, [_show_values(show)], sign=-1)
+
+
+@db.event.listens_for(Show, 'after_update')
+def recount_updated_show(mapper, connection, show):
+    previous, current = _show_values(show, previous=True), _show_values(show)
+    if previous == current:
+        count_shows(connection, [current], sign=0)
+    else:
+        count_shows(connection, [previous], sign=-1)
+        count_shows(connection, [current])
@@ -0,0 +1,175 @@
+"""Monthly range partitions of the shows table (Postgres).
+
+Migration f4a7c2e8b619 turns ``shows`` into a table partitioned by RANGE
+(start_time), one partition per calendar month named ``shows_YYYY_MM``.
+Queries bounded on start_time (the upcoming and /shows paths) only touch
+the partitions in range, and each partition carries its own small copy of
+the show indexes.
+
+Partitions for the coming months are created ahead of time by `flask
+create-show-partitions` (run it daily); writers also create the partition
+for a month that is still missing, so a show booked far ahead never fails.
+`flask archive-show-partitions` detaches old months into the archive schema
+(or drops them), one month per transaction. On other databases, or before the migration, everything
+here is a no-op.
+"""
+import re
+from datetime import datetime
+
+from models import db, Show, ShowCounterState
+
+NAME = re.compile(r'^shows_(\d{4})_(\d{2})$')
+
+# Months known to have a partition, filled from the catalog on demand
+_known_months = set()
+
+
+def month_floor(value):
+    return datetime(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    """First day of the month ``count`` months after (or before) ``month``."""
+    index = month.year * 12 + month.month - 1 + count
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def next_month(month):
+    return add_months(month, 1)
+
+
+def partition_name(month):
+    return 'shows_{:%Y_%m}'.format(month)
+
+
+def is_partitioned(connection):
+    if connection.dialect.name != 'postgresql':
+        return False
+    return connection.execute(db.text(
+        'SELECT EXISTS (SELECT 1 FROM pg_partitioned_table '
+        "WHERE partrelid = to_regclass('shows'))")).scalar()
+
+
+def attached_months(connection):
+    """Months of the partitions attached to shows, oldest first."""
+    names = connection.execute(db.text(
+        'SELECT child.relname FROM pg_inherits '
+        'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+        "WHERE pg_inherits.inhparent = to_regclass('shows')")).scalars()
+    months = []
+    for name in names:
+        match = NAME.match(name)
+        if match:
+            months.append(datetime(int(match.group(1)),
+                                   int(match.group(2)), 1))
+    return sorted(months)
+
+
+def create_partition(connection, month):
+    # Bounds are formatted from datetimes, never from user input
+    connection.execute(db.text(
+        "CREATE TABLE IF NOT EXISTS {} PARTITION OF shows "
+        "FOR VALUES FROM ('{:%Y-%m-%d}') TO ('{:%Y-%m-%d}')".format(
+            partition_name(month), month, next_month(month))))
+
+
+def ensure_partitions(connection, start, end):
+    """Create the missing partitions for every month from start to end.
+
+    Returns the names of the partitions created.
+    """
+    if not is_partitioned(connection):
+        return []
+    existing = set(attached_months(connection))
+    created = []
+    month = month_floor(start)
+    while month <= end:
+        if month not in existing:
+            create_partition(connection, month)
+            created.append(partition_name(month))
+        month = next_month(month)
+    return created
+
+
+def ensure_partitions_for(connection, start_times):
+    """Make sure shows starting at ``start_times`` have a partition to go to.
+
+    Called before shows are inserted. Only touches the catalog when a month
+    is not yet known to this process, so the usual cost is a set lookup.
+    Creating a partition locks shows until the transaction ends, which only
+    happens for a month nobody has booked yet.
+    """
+    months = {month_floor(start_time) for start_time in start_times
+              if start_time is not None}
+    if months <= _known_months:
+        return
+    if not is_partitioned(connection):
+        _known_months.update(months)
+        return
+    _known_months.update(attached_months(connection))
+    for month in sorted(months - _known_months):
+        # Not remembered until seen in the catalog: the transaction that
+        # creates it may still roll back.
+        create_partition(connection, month)
+
+
+@db.event.listens_for(Show, 'before_insert')
+@db.event.listens_for(Show, 'before_update')
+def ensure_show_partition(mapper, connection, show):
+    ensure_partitions_for(connection, [show.start_time])
+
+
+def archivable_months(connection, before):
+    """Months of the attached partitions that end on or before ``before``.
+
+    Only months wholly before the show counter watermark qualify, so every
+    show in them was counted as past. The watermark only moves forward, so it
+    is read without a lock.
+    """
+    if not is_partitioned(connection):
+        return []
+    rolled_to = connection.execute(db.select(
+        [ShowCounterState.rolled_to]).where(ShowCounterState.id == 1)).scalar()
+    if rolled_to is None:
+        return []
+    cutoff = min(before, rolled_to)
+    return [month for month in attached_months(connection)
+            if next_month(month) <= cutoff]
+
+
+def archive_partition(connection, month, drop=False, schema='archive'):
+    """Detach the partition of ``month`` (one of archivable_months()).
+
+    Its shows are taken off the venues' and artists' past show counts (and
+    the partners' updated_at is bumped, as their pages lose those shows) in
+    the same transaction. The detached table moves to ``schema``, or is
+    dropped with ``drop``. Returns its name. Does not commit: archive one
+    month per transaction, as shows stays locked until the commit.
+    """
+    name = partition_name(month)
+    # Writes to the month wait from here on, so none lands in it after its
+    # shows were counted; reads of shows carry on during the count.
+    connection.execute(db.text('LOCK TABLE {} IN SHARE MODE'.format(name)))
+    for table, key in (('venue', 'venue_id'), ('artist', 'artist_id')):
+        connection.execute(db.text(
+            'CREATE TEMPORARY TABLE archived_{table}_shows ON COMMIT DROP AS '
+            'SELECT {key} AS entity_id, count(*) AS shows FROM {name} '
+            'GROUP BY {key}'.format(table=table, key=key, name=name)))
+    # Only this locks shows exclusively, for the few statements left
+    connection.execute(db.text(
+        'ALTER TABLE shows DETACH PARTITION {}'.format(name)))
+    for table in ('venue', 'artist'):
+        connection.execute(db.text(
+            'UPDATE {table} SET past_show_count = past_show_count - '
+            'counts.shows, updated_at = localtimestamp '
+            'FROM archived_{table}_shows AS counts '
+            'WHERE {table}.id = counts.entity_id'.format(table=table)))
+    if drop:
+        connection.execute(db.text('DROP TABLE {}'.format(name)))
+    else:
+        connection.execute(db.text(
+            'CREATE SCHEMA IF NOT EXISTS {}'.format(schema)))
+        connection.execute(db.text('ALTER TABLE {} SET SCHEMA {}'.format(
+            name, schema)))
+    _known_months.discard(month)
+    return name
@@ -0,0 +1,249 @@
+"""Read queries shared by the Flask views and the async API.
+
+Each page is built from statements returned here, executed by the caller
+(``db.session.execute`` in the views, an ``AsyncSession`` in api.py), and
+rows shaped by the functions below, so both front ends serve the same data.
+"""
+from datetime import datetime
+from itertools import groupby
+
+from models import db, Artist, Show, Venue
+
+
+def encode_cursor(start_time, show_id):
+    """Encode a (start_time, id) keyset position for use in a URL."""
+    return '{}_{}'.format(start_time.isoformat(), show_id)
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; ``None`` passes through, bad input raises ValueError."""
+    if not cursor:
+        return None
+    start_time, _, show_id = cursor.rpartition('_')
+    return datetime.fromisoformat(start_time), int(show_id)
+
+
+def venue_areas_statement():
+    """Venues with their upcoming show count, ordered by area.
+
+    The counts are the maintained ``upcoming_show_count`` columns, so this
+    reads the venue table alone; group_areas folds the ordered rows in one
+    pass.
+    """
+    return db.select([
+        Venue.city, Venue.state, Venue.id, Venue.name,
+        Venue.upcoming_show_count.label('num_upcoming_shows')
+    ]).where(Venue.deleted_at.is_(None)).order_by(Venue.state, Venue.city,
+                                                  Venue.id)
+
+
+def group_areas(rows):
+    data = []
+    for (city, state), area_venues in groupby(rows,
+                                              key=lambda row:
+                                              (row.city, row.state)):
+        data.append({
+            'city': city,
+            'state': state,
+            'venues': [{
+                'id': venue.id,
+                'name': venue.name,
+                'num_upcoming_shows': venue.num_upcoming_shows
+            } for venue in area_venues]
+        })
+    return data
+
+
+def artists_statement():
+    return db.select([Artist.id, Artist.name]).where(
+        Artist.deleted_at.is_(None)).order_by(Artist.name)
+
+
+def venue_shows_statement(venue_id):
+    """Shows at a venue with the artist columns show_venue.html renders."""
+    return db.select([
+        Show.start_time,
+        Artist.id.label('artist_id'),
+        Artist.name.label('artist_name'),
+        Artist.image_link.label('artist_image_link')
+    ]).join(Artist, Show.artist_id == Artist.id).where(
+        Show.venue_id == venue_id,
+        Artist.deleted_at.is_(None)).order_by(Show.start_time)
+
+
+def artist_shows_statement(artist_id):
+    """Shows of an artist with the venue columns show_artist.html renders."""
+    return db.select([
+        Show.start_time,
+        Venue.id.label('venue_id'),
+        Venue.name.label('venue_name'),
+        Venue.image_link.label('venue_image_link')
+    ]).join(Venue, Show.venue_id == Venue.id).where(
+        Show.artist_id == artist_id,
+        Venue.deleted_at.is_(None)).order_by(Show.start_time)
+
+
+def split_shows(rows):
+    """Split show rows into (past, upcoming) lists of template dicts.
+
+    ``rows`` is an iterable of named rows carrying ``start_time`` plus the
+    related artist/venue columns the detail templates render; it is walked
+    exactly once.
+    """
+    now = datetime.now()
+    past_shows, upcoming_shows = [], []
+    for row in rows:
+        show = row._asdict()
+        if row.start_time > now:
+            upcoming_shows.append(show)
+        else:
+            past_shows.append(show)
+    return past_shows, upcoming_shows
+
+
+def venue_detail(venue, show_rows):
+    past_shows, upcoming_shows = split_shows(show_rows)
+    return {
+        'id':
+        venue.id,
+        'name':
+        venue.name,
+        'genres':
+        venue.genres,
+        'address':
+        venue.address,
+        'city':
+        venue.city,
+        'state':
+        venue.state,
+        'phone':
+        venue.phone,
+        'website':
+        venue.website,
+        'facebook_link':
+        venue.facebook_link,
+        'seeking_talent':
+        venue.seeking_talent,
+        'seeking_description':
+        venue.seeking_description,
+        'image_link':
+        venue.image_link,
+        'past_shows':
+        past_shows,
+        'upcoming_shows':
+        upcoming_shows,
+        'past_shows_count':
+        len(past_shows),
+        'upcoming_shows_count':
+        len(upcoming_shows)
+    }
+
+
+def artist_detail(artist, show_rows):
+    past_shows, upcoming_shows = split_shows(show_rows)
+    return {
+        'id':
+        artist.id,
+        'name':
+        artist.name,
+        'genres':
+        artist.genres,
+        'city':
+        artist.city,
+        'state':
+        artist.state,
+        'phone':
+        artist.phone,
+        'website':
+        artist.website,
+        'facebook_link':
+        artist.facebook_link,
+        'seeking_venue':
+        artist.seeking_venue,
+        'seeking_description':
+        artist.seeking_description,
+        'image_link':
+        artist.image_link,
+        'past_shows':
+        past_shows,
+        'upcoming_shows':
+        upcoming_shows,
+        'past_shows_count':
+        len(past_shows),
+        'upcoming_shows_count':
+        len(upcoming_shows)
+    }
+
+
+def shows_page_statement(after, before, page_size, now):
+    """One keyset page of shows (plus one row to detect a further page).
+
+    Pagination is on (start_time, id): each page is one indexed range scan,
+    so latency does not depend on how many shows precede it. Without a
+    cursor the page starts at the first upcoming show. ``before`` pages are
+    fetched in descending order; shows_page puts them back in order. The
+    cursor bounds are repeated on start_time alone, which (unlike the row
+    comparison) lets Postgres prune the monthly partitions of shows.
+    """
+    key = db.tuple_(Show.start_time, Show.id)
+    statement = db.select([
+        Show.id, Show.start_time, Show.venue_id,
+        Venue.name.label('venue_name'), Show.artist_id,
+        Artist.name.label('artist_name'),
+        Artist.image_link.label('artist_image_link')
+    ]).join(Venue, Show.venue_id == Venue.id).join(
+        Artist, Show.artist_id == Artist.id).where(
+            Venue.deleted_at.is_(None), Artist.deleted_at.is_(None))
+    if before is not None:
+        return statement.where(
+            key < before, Show.start_time <= before[0]).order_by(
+            Show.start_time.desc(), Show.id.desc()).limit(page_size + 1)
+    if after is not None:
+        statement = statement.where(key > after, Show.start_time >= after[0])
+    else:
+        statement = statement.where(Show.start_time >= now)
+    return statement.order_by(Show.start_time, Show.id).limit(page_size + 1)
+
+
+def earlier_shows_statement(now):
+    """Whether any show precedes the default (first upcoming) page."""
+    return db.select([db.exists().where(Show.start_time < now)])
+
+
+def shows_page(rows, after, before, page_size, has_earlier=False):
+    """Shape shows_page_statement rows into ``(data, pages)``.
+
+    ``after``/``before`` are the raw cursor strings of the request and
+    ``has_earlier`` the result of earlier_shows_statement, only needed for
+    the default page. ``pages`` holds the cursors of the neighbouring pages.
+    """
+    if before:
+        has_previous, has_next = len(rows) > page_size, True
+        rows = rows[:page_size][::-1]
+    else:
+        has_previous = bool(after) or bool(has_earlier)
+        has_next = len(rows) > page_size
+        rows = rows[:page_size]
+
+    data = [{
+        'venue_id': show.venue_id,
+        'venue_name': show.venue_name,
+        'artist_id': show.artist_id,
+        'artist_name': show.artist_name,
+        'artist_image_link': show.artist_image_link,
+        'start_time': show.start_time
+    } for show in rows]
+    pages = {
+        'previous': None,
+        'next': None,
+    }
+    if rows:
+        if has_previous:
+            pages['previous'] = encode_cursor(rows[0].start_time, rows[0].id)
+        if has_next:
+            pages['next'] = encode_cursor(rows[-1].start_time, rows[-1].id)
+    elif before:
+        pages['next'] = before
+    elif after:
+        pages['previous'] = after
+    return data, pages
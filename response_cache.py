@@ -0,0 +1,248 @@
+import pickle
+import time
+from collections import OrderedDict
+from functools import wraps
+from threading import Lock
+
+from flask import Response, request, session
+
+
+class CacheStats(object):
+    """Hit/miss/eviction counters shared by the cache backends."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.stale = 0
+
+    def as_dict(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': float(self.hits) / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations,
+            'stale': self.stale,
+        }
+
+
+class LRUBackend(object):
+    """In-process cache bounded by entry count and TTL, evicting LRU first.
+
+    Each process has its own copy, and an invalidation only clears the copy of
+    the process that made the write; other workers serve their entries until
+    the TTL runs out. Use it for a single process (``flask run``, ``gunicorn
+    -w 1 --threads N``) and the Redis backend for more.
+    """
+
+    def __init__(self, max_entries=512, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._entries = OrderedDict()
+        self._tags = {}
+        self._generations = {}
+        self._lock = Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats.misses += 1
+                return None
+            expires, tag, value = entry
+            if expires < time.time():
+                self._discard(key)
+                self.stats.expirations += 1
+                self.stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return value
+
+    def generation(self, tag):
+        with self._lock:
+            return self._generations.get(tag, 0)
+
+    def set(self, key, value, tag, generation=None):
+        with self._lock:
+            if (generation is not None
+                    and generation != self._generations.get(tag, 0)):
+                self.stats.stale += 1
+                return
+            self._discard(key)
+            self._entries[key] = (time.time() + self.ttl, tag, value)
+            self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._discard(next(iter(self._entries)))
+                self.stats.evictions += 1
+
+    def invalidate(self, tag):
+        with self._lock:
+            self._generations[tag] = self._generations.get(tag, 0) + 1
+            for key in list(self._tags.get(tag, ())):
+                self._discard(key)
+                self.stats.invalidations += 1
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._tags[entry[1]].discard(key)
+
+    def size(self):
+        return len(self._entries)
+
+
+class RedisBackend(object):
+    """Shared cache for multi-process deployments, backed by Redis.
+
+    Entries expire through Redis TTLs and eviction is left to the server's
+    ``maxmemory-policy`` (``allkeys-lru`` is recommended). Keys are grouped in
+    one Redis set per tag so invalidation reaches every worker, and the tag
+    generations live in Redis too. Counters are per process.
+    """
+
+    def __init__(self, url, ttl=300, prefix='fyyur:page:'):
+        import redis
+        self.ttl = ttl
+        self.prefix = prefix
+        self.stats = CacheStats()
+        self._redis = redis.Redis.from_url(url)
+        self._watch_error = redis.WatchError
+
+    def get(self, key):
+        value = self._redis.get(self.prefix + key)
+        if value is None:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return pickle.loads(value)
+
+    def generation(self, tag):
+        return int(self._redis.get(self.prefix + 'gen:' + tag) or 0)
+
+    def set(self, key, value, tag, generation=None):
+        gen_key = self.prefix + 'gen:' + tag
+        with self._redis.pipeline() as pipe:
+            try:
+                # The write is dropped if any worker invalidates the tag
+                # between the check and EXEC.
+                pipe.watch(gen_key)
+                if (generation is not None
+                        and generation != int(pipe.get(gen_key) or 0)):
+                    self.stats.stale += 1
+                    return
+                pipe.multi()
+                pipe.set(self.prefix + key, pickle.dumps(value), ex=self.ttl)
+                pipe.sadd(self.prefix + 'tag:' + tag, self.prefix + key)
+                pipe.expire(self.prefix + 'tag:' + tag, self.ttl)
+                pipe.execute()
+            except self._watch_error:
+                self.stats.stale += 1
+
+    def invalidate(self, tag):
+        tag_key = self.prefix + 'tag:' + tag
+        keys = self._redis.smembers(tag_key)
+        pipe = self._redis.pipeline()
+        pipe.incr(self.prefix + 'gen:' + tag)
+        if keys:
+            pipe.delete(*keys)
+        pipe.delete(tag_key)
+        pipe.execute()
+        self.stats.invalidations += len(keys)
+
+    def size(self):
+        return None
+
+
+class ResponseCache(object):
+    """Caches whole GET responses of list pages until a write invalidates them.
+
+    Views opt in with ``@response_cache.cached('<tag>')``; write handlers call
+    ``response_cache.invalidate('<tag>', ...)`` after committing. Requests
+    carrying flashed messages bypass the cache in both directions, so a flash
+    is never served to another visitor or swallowed by a hit.
+
+    Every invalidation bumps a generation counter for the tag. A render notes
+    the generation before it queries and is not stored if the counter moved
+    meanwhile, so a page rendered from data older than the write cannot be
+    cached after the invalidation.
+
+    The default ``memory`` backend only works for one process; with several
+    workers set ``RESPONSE_CACHE_BACKEND = 'redis'``.
+    """
+
+    def __init__(self, app=None):
+        self.backend = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        ttl = app.config.get('RESPONSE_CACHE_TTL', 300)
+        if app.config.get('RESPONSE_CACHE_BACKEND', 'memory') == 'redis':
+            self.backend = RedisBackend(app.config['RESPONSE_CACHE_REDIS_URL'],
+                                        ttl=ttl)
+        else:
+            self.backend = LRUBackend(
+                max_entries=app.config.get('RESPONSE_CACHE_MAX_ENTRIES', 512),
+                ttl=ttl)
+        self.enabled = app.config.get('RESPONSE_CACHE_ENABLED', True)
+        self.ttl = ttl
+
+    @property
+    def shared(self):
+        """Whether other processes see this process's invalidations."""
+        return isinstance(self.backend, RedisBackend)
+
+    def cached(self, tag):
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if not self.enabled or '_flashes' in session:
+                    return view(*args, **kwargs)
+                key = tag + ':' + request.full_path
+                hit = self.backend.get(key)
+                if hit is not None:
+                    body, status, mimetype = hit
+                    return Response(body, status=status, mimetype=mimetype)
+                generation = self.backend.generation(tag)
+                response = view(*args, **kwargs)
+                if not isinstance(response, Response):
+                    response = Response(response)
+                if response.status_code != 200 or '_flashes' in session:
+                    return response
+                if response.is_streamed:
+                    # Store the page once the last chunk has been sent, without
+                    # holding back the first one.
+                    response.response = self._tee(response.response, key, tag,
+                                                  response.mimetype, generation)
+                else:
+                    self.backend.set(key, (response.get_data(),
+                                           response.status_code,
+                                           response.mimetype), tag, generation)
+                return response
+            return wrapper
+        return decorator
+
+    def _tee(self, chunks, key, tag, mimetype, generation):
+        body = []
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            body.append(chunk)
+            yield chunk
+        self.backend.set(key, (b''.join(body), 200, mimetype), tag, generation)
+
+    def invalidate(self, *tags):
+        for tag in tags:
+            self.backend.invalidate(tag)
+
+    def stats(self):
+        stats = self.backend.stats.as_dict()
+        stats['entries'] = self.backend.size()
+        return stats
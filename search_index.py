@@ -0,0 +1,89 @@
+from bisect import bisect_left, insort
+from threading import Lock
+
+
+class PrefixIndex(object):
+    """In-memory sorted-array index answering name prefix lookups.
+
+    Every name is stored once per word it contains, keyed by the lowercased
+    remainder of the name from that word on, so "mus" finds both
+    "Musical Hop" and "The Musical Hop". Lookups are a binary search plus a
+    short scan; adds and removes keep the array sorted in place.
+
+    ``refreshed_at`` is when the contents were last read from the database,
+    kept for helpers.refresh_name_index().
+    """
+
+    def __init__(self):
+        self.refreshed_at = None
+        self._keys = []
+        self._names = {}
+        self._lock = Lock()
+
+    @staticmethod
+    def _word_keys(name):
+        lowered = (name or '').lower()
+        starts = [i for i, char in enumerate(lowered)
+                  if not char.isspace() and (i == 0 or lowered[i - 1].isspace())]
+        return {lowered[i:] for i in starts}
+
+    def _insert(self, entry_id, name):
+        self._names[entry_id] = name
+        for key in self._word_keys(name):
+            insort(self._keys, (key, entry_id))
+
+    def _delete(self, entry_id):
+        name = self._names.pop(entry_id, None)
+        if name is None:
+            return
+        for key in self._word_keys(name):
+            position = bisect_left(self._keys, (key, entry_id))
+            if position < len(self._keys) and self._keys[position] == (key, entry_id):
+                del self._keys[position]
+
+    def rebuild(self, rows):
+        """Replace the index contents with ``(id, name)`` pairs."""
+        names = {entry_id: name for entry_id, name in rows}
+        keys = sorted((key, entry_id) for entry_id, name in names.items()
+                      for key in self._word_keys(name))
+        with self._lock:
+            self._names, self._keys = names, keys
+
+    def add(self, entry_id, name):
+        """Index ``name`` under ``entry_id``, replacing any previous name."""
+        with self._lock:
+            self._delete(entry_id)
+            self._insert(entry_id, name)
+
+    def remove(self, entry_id):
+        with self._lock:
+            self._delete(entry_id)
+
+    def apply(self, rows):
+        """Add ``(id, name)`` pairs, removing the ids whose name is None."""
+        with self._lock:
+            for entry_id, name in rows:
+                self._delete(entry_id)
+                if name is not None:
+                    self._insert(entry_id, name)
+
+    def search(self, prefix, limit=10):
+        """Return up to ``limit`` ``{'id', 'name'}`` dicts matching ``prefix``."""
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+        results, seen = [], set()
+        with self._lock:
+            position = bisect_left(self._keys, (prefix, ))
+            while position < len(self._keys) and len(results) < limit:
+                key, entry_id = self._keys[position]
+                if not key.startswith(prefix):
+                    break
+                if entry_id not in seen:
+                    seen.add(entry_id)
+                    results.append({'id': entry_id, 'name': self._names[entry_id]})
+                position += 1
+        return results
+
+    def __len__(self):
+        return len(self._names)
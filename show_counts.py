@@ -0,0 +1,97 @@
+"""Roll-over and consistency checks for the denormalized show counters.
+
+Venue and Artist carry ``upcoming_show_count``/``past_show_count``, split at
+``ShowCounterState.rolled_to``: writers count shows against it through
+models.count_shows(), and roll_over() (run every minute or so by
+`flask roll-show-counts --every 60`) moves the shows it passes from upcoming
+to past. check() recomputes the counters from the shows table and repairs
+any drift, e.g. after rows were written with raw SQL.
+"""
+from datetime import datetime
+
+from models import (db, show_counter_watermark, Artist, Show,
+                    ShowCounterState, Venue)
+
+
+def roll_over(now=None):
+    """Move shows that started since the last roll-over to the past counts.
+
+    Returns the number of shows moved. Runs in its own transaction and holds
+    the watermark row exclusively, so concurrent roll-overs (one per worker
+    or clock process) serialize and the later ones find nothing to move.
+    """
+    now = now or datetime.now()
+    rolled_to = show_counter_watermark(db.session, exclusive=True)
+    if now <= rolled_to:
+        db.session.rollback()
+        return 0
+    passed = db.and_(Show.start_time > rolled_to, Show.start_time <= now)
+    moved = db.session.execute(
+        db.select([db.func.count(Show.id)]).where(passed)).scalar()
+    if moved:
+        for model in (Venue, Artist):
+            key = getattr(Show, model._show_key)
+            started = db.select([db.func.count(Show.id)]).where(
+                db.and_(key == model.id, passed)).scalar_subquery()
+            db.session.execute(model.__table__.update().where(
+                model.id.in_(db.select([key]).where(passed))).values(
+                    upcoming_show_count=model.upcoming_show_count - started,
+                    past_show_count=model.past_show_count + started))
+    db.session.execute(ShowCounterState.__table__.update().values(
+        rolled_to=now))
+    db.session.commit()
+    return moved
+
+
+def drifted(model, rolled_to):
+    """Rows of ``model`` whose counters disagree with the shows table.
+
+    Each row is (id, upcoming_show_count, past_show_count, upcoming, past),
+    the last two counted from shows with one grouped scan.
+    """
+    key = getattr(Show, model._show_key)
+    counts = db.select([
+        key.label('entity_id'),
+        db.func.count(db.case([(Show.start_time > rolled_to, 1)])).label(
+            'upcoming'),
+        db.func.count(db.case([(Show.start_time <= rolled_to, 1)])).label(
+            'past')
+    ]).group_by(key).subquery()
+    upcoming = db.func.coalesce(counts.c.upcoming, 0)
+    past = db.func.coalesce(counts.c.past, 0)
+    return db.session.execute(db.select([
+        model.id, model.upcoming_show_count, model.past_show_count,
+        upcoming.label('upcoming'), past.label('past')
+    ]).select_from(model.__table__.outerjoin(
+        counts, counts.c.entity_id == model.id)).where(db.or_(
+            model.upcoming_show_count != upcoming,
+            model.past_show_count != past)).order_by(model.id)).all()
+
+
+def check(repair=False):
+    """Compare every counter with the shows table, optionally fixing it.
+
+    Returns ``{'venue': rows, 'artist': rows}`` as given by drifted(). With
+    ``repair``, the watermark is held exclusively while the drifted rows
+    are rewritten, so no show can be counted in between.
+    """
+    rolled_to = show_counter_watermark(db.session, exclusive=repair)
+    report = {}
+    for model in (Venue, Artist):
+        rows = drifted(model, rolled_to)
+        report[model.__tablename__] = rows
+        if repair and rows:
+            table = model.__table__
+            db.session.execute(table.update().where(
+                table.c.id == db.bindparam('entity_id')).values(
+                    upcoming_show_count=db.bindparam('upcoming'),
+                    past_show_count=db.bindparam('past')), [{
+                        'entity_id': row.id,
+                        'upcoming': row.upcoming,
+                        'past': row.past
+                    } for row in rows])
+    if repair:
+        db.session.commit()
+    else:
+        db.session.rollback()
+    return report
@@ -0,0 +1,203 @@
+from datetime import datetime
+from itertools import islice
+
+from flask import (Blueprint, abort, current_app, flash, jsonify, redirect,
+                   render_template, request, url_for)
+
+from db_routing import read_only
+from extensions import response_cache
+from helpers import stream_page
+from models import count_shows, db, Artist, Show, Venue
+import partitions
+import queries
+
+bp = Blueprint('shows', __name__)
+
+
+def expand_recurrence(start_time, repeat='once', weekdays=None, until=None):
+    """Expand a show start and recurrence rule into a list of start times.
+
+    ``repeat`` is once/daily/weekly/monthly, ``weekdays`` optionally narrows
+    weekly shows to a list of days such as ``['FR']`` and ``until`` is the
+    inclusive last date. Raises ValueError for an unknown rule or weekday or
+    more than MAX_SHOWS_PER_BATCH occurrences.
+    """
+    if start_time is None:
+        raise ValueError('A start time is required.')
+    if repeat in (None, '', 'once'):
+        return [start_time]
+    from dateutil import rrule
+    frequencies = {'daily': rrule.DAILY, 'weekly': rrule.WEEKLY,
+                   'monthly': rrule.MONTHLY}
+    if repeat not in frequencies or until is None:
+        raise ValueError('A repeating show needs a valid rule and end date.')
+    days = {'MO': rrule.MO, 'TU': rrule.TU, 'WE': rrule.WE, 'TH': rrule.TH,
+            'FR': rrule.FR, 'SA': rrule.SA, 'SU': rrule.SU}
+    if weekdays is not None and not isinstance(weekdays, list):
+        raise ValueError('Weekdays must be a list such as ["FR"].')
+    if any(day not in days for day in weekdays or []):
+        raise ValueError('Weekdays must be among {}.'.format(', '.join(days)))
+    byweekday = [days[day] for day in weekdays or []] or None
+    limit = current_app.config['MAX_SHOWS_PER_BATCH']
+    occurrences = list(islice(rrule.rrule(
+        frequencies[repeat], dtstart=start_time, byweekday=byweekday,
+        until=datetime.combine(until, datetime.max.time())), limit + 1))
+    if len(occurrences) > limit:
+        raise ValueError('At most {} shows can be created at once.'.format(limit))
+    return occurrences
+
+
+def bulk_insert_shows(rows):
+    """Insert show rows with one multi-row INSERT and count them.
+
+    Core inserts bypass the Show mapper events, so the venues' and artists'
+    show counters and updated_at are updated here instead. Does not commit.
+    """
+    partitions.ensure_partitions_for(
+        db.session.connection(), [row['start_time'] for row in rows])
+    db.session.execute(Show.__table__.insert(), rows)
+    count_shows(db.session, [(row['venue_id'], row['artist_id'],
+                              row['start_time']) for row in rows])
+
+
+def create_show_batch(entries):
+    """Validate and insert a batch of shows in a single transaction.
+
+    All artist and venue ids are checked with one query before anything is
+    written. Raises ValueError on an empty or oversized batch or an unknown
+    id. Returns the number of shows created.
+    """
+    limit = current_app.config['MAX_SHOWS_PER_BATCH']
+    if not entries or len(entries) > limit:
+        raise ValueError(
+            'Between 1 and {} shows can be created at once.'.format(limit))
+    rows = [{
+        'artist_id': int(entry['artist_id']),
+        'venue_id': int(entry['venue_id']),
+        'start_time': entry['start_time']
+    } for entry in entries]
+    artist_ids = {row['artist_id'] for row in rows}
+    venue_ids = {row['venue_id'] for row in rows}
+    found = db.session.execute(db.union_all(
+        db.select([db.literal('artist').label('kind'), Artist.id]).where(
+            Artist.id.in_(artist_ids), Artist.deleted_at.is_(None)),
+        db.select([db.literal('venue').label('kind'), Venue.id]).where(
+            Venue.id.in_(venue_ids), Venue.deleted_at.is_(None)))).fetchall()
+    missing_artists = artist_ids - {found_id for kind, found_id in found if kind == 'artist'}
+    missing_venues = venue_ids - {found_id for kind, found_id in found if kind == 'venue'}
+    if missing_artists or missing_venues:
+        raise ValueError('Unknown artist ids {} / venue ids {}'.format(
+            sorted(missing_artists), sorted(missing_venues)))
+    bulk_insert_shows(rows)
+    db.session.commit()
+    response_cache.invalidate('shows', 'venues')
+    return len(rows)
+
+
+#  Shows
+#  ----------------------------------------------------------------
+
+
+@bp.route('/shows')
+@read_only
+@response_cache.cached('shows')
+def shows():
+    # displays list of shows at /shows
+    # DONE: replace with real venues data.
+
+    page_size = current_app.config['SHOWS_PER_PAGE']
+    after, before = request.args.get('after'), request.args.get('before')
+    try:
+        after_key = queries.decode_cursor(after)
+        before_key = queries.decode_cursor(before)
+    except ValueError:
+        abort(400)
+    now = datetime.now()
+    rows = db.session.execute(queries.shows_page_statement(
+        after_key, before_key, page_size, now)).all()
+    has_earlier = False
+    if not after and not before:
+        has_earlier = db.session.execute(
+            queries.earlier_shows_statement(now)).scalar()
+    data, pages = queries.shows_page(rows, after, before, page_size,
+                                     has_earlier)
+    return stream_page('pages/shows.html', shows=data, pages=pages)
+
+
+@bp.route('/shows/create')
+def create_shows():
+    # renders form. do not touch.
+    from forms import ShowForm
+    form = ShowForm()
+    return render_template('forms/new_show.html', form=form)
+
+
+@bp.route('/shows/create', methods=['POST'])
+def create_show_submission():
+    # called to create new shows in the db, upon submitting new show listing form
+    # DONE: insert form data as a new Show record in the db, instead
+    from forms import ShowForm
+    form = ShowForm()
+
+    try:
+        start_times = expand_recurrence(form.start_time.data, form.repeat.data,
+                                        form.weekdays.data, form.until.data)
+        count = create_show_batch([{
+            'artist_id': form.artist_id.data,
+            'venue_id': form.venue_id.data,
+            'start_time': start_time
+        } for start_time in start_times])
+        # on successful db insert, flash success
+        if count == 1:
+            flash('Show was successfully listed!')
+        else:
+            flash('{} shows were successfully listed!'.format(count))
+    except Exception as e:
+        print(e)
+        # e.g., flash('An error occurred. Venue ' + data.name + ' could not be listed.')
+        flash('An error occurred. Show could not be listed.')
+        db.session.rollback()
+    finally:
+        db.session.close()
+    return redirect(url_for(".shows"))
+
+    # on successful db insert, flash success
+    #flash('Show was successfully listed!')
+    # DONE: on unsuccessful db insert, flash an error instead.
+    # e.g., flash('An error occurred. Show could not be listed.')
+    # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
+    #return render_template('pages/home.html')
+
+@bp.route('/api/shows', methods=['POST'])
+def create_shows_api():
+    """Create shows from JSON in one transaction.
+
+    The body is either ``{"shows": [{"artist_id", "venue_id", "start_time"},
+    ...]}`` or a single show with a recurrence, e.g. ``{"artist_id": 1,
+    "venue_id": 2, "start_time": "2026-11-06T21:00:00", "repeat": "weekly",
+    "weekdays": ["FR"], "until": "2027-01-29"}``.
+    """
+    payload = request.get_json(silent=True) or {}
+    try:
+        if not isinstance(payload, dict):
+            raise ValueError('The body must be a JSON object.')
+        if 'shows' in payload:
+            entries = [dict(entry, start_time=datetime.fromisoformat(
+                entry['start_time'])) for entry in payload['shows']]
+        else:
+            until = payload.get('until')
+            entries = [{
+                'artist_id': payload['artist_id'],
+                'venue_id': payload['venue_id'],
+                'start_time': start_time
+            } for start_time in expand_recurrence(
+                datetime.fromisoformat(payload['start_time']),
+                payload.get('repeat', 'once'), payload.get('weekdays'),
+                until and datetime.fromisoformat(until).date())]
+        count = create_show_batch(entries)
+    except (KeyError, TypeError, ValueError) as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    finally:
+        db.session.close()
+    return jsonify({'created': count}), 201
@@ -2,3 +2,33 @@ window.parseISOString = function parseISOString(s) {
   var b = s.split(/\D+/);
   return new Date(Date.UTC(b[0], --b[1], b[2], b[3], b[4], b[5], b[6]));
 };
+
+// Fill the <datalist> of every input[data-autocomplete] with suggestions from
+// its endpoint as the user types. data-autocomplete-value picks which field
+// of a suggestion is inserted ("name" by default, "id" for the show form).
+document.addEventListener('DOMContentLoaded', function () {
+  var inputs = document.querySelectorAll('input[data-autocomplete]');
+  Array.prototype.forEach.call(inputs, function (input) {
+    var list = document.getElementById(input.getAttribute('list'));
+    var field = input.getAttribute('data-autocomplete-value') || 'name';
+    var pending = 0;
+    input.addEventListener('input', function () {
+      var request = ++pending;
+      var url = input.getAttribute('data-autocomplete') + '?q=' + encodeURIComponent(input.value);
+      fetch(url).then(function (response) {
+        return response.json();
+      }).then(function (suggestions) {
+        if (request !== pending) {
+          return;
+        }
+        list.innerHTML = '';
+        suggestions.forEach(function (suggestion) {
+          var option = document.createElement('option');
+          option.value = suggestion[field];
+          option.label = suggestion.name;
+          list.appendChild(option);
+        });
+      });
+    });
+  });
+});
@@ -0,0 +1,56 @@
+"""Fingerprinted builds of static/ made by ``flask build-assets``.
+
+    python test_assets.py -v
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+import assets
+
+
+class BuildTest(unittest.TestCase):
+
+    def setUp(self):
+        self.static_dir = tempfile.mkdtemp()
+        self.out_dir = os.path.join(self.static_dir, assets.BUILD_DIR)
+        os.makedirs(os.path.join(self.static_dir, 'js'))
+
+    def tearDown(self):
+        shutil.rmtree(self.static_dir)
+
+    def build(self, script, keep=2):
+        with open(os.path.join(self.static_dir, 'js', 'app.js'), 'w') as handle:
+            handle.write(script)
+        return assets.build(self.static_dir, keep)['js/app.js']
+
+    def exists(self, built):
+        return os.path.exists(os.path.join(self.out_dir, built))
+
+    def test_previous_builds_are_kept_until_pruned(self):
+        first = self.build('var version = 1;')
+        second = self.build('var version = 2;')
+        self.assertTrue(self.exists(first))
+        self.assertTrue(self.exists(first + '.gz'))
+        third = self.build('var version = 3;')
+        self.assertFalse(self.exists(first))
+        self.assertFalse(self.exists(first + '.gz'))
+        self.assertTrue(self.exists(second))
+        self.assertTrue(self.exists(third))
+
+    def test_rebuilding_unchanged_files_keeps_them(self):
+        built = self.build('var version = 1;')
+        self.build('var version = 1;')
+        self.build('var version = 1;')
+        self.assertTrue(self.exists(built))
+
+    def test_a_build_from_before_the_history_counts_as_previous(self):
+        first = self.build('var version = 1;')
+        os.remove(os.path.join(self.out_dir, assets.HISTORY))
+        self.build('var version = 2;')
+        self.assertTrue(self.exists(first))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+"""Parsing of the files read by ``flask import``.
+
+    python test_importer.py -v
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from importer import read_records
+
+
+class ReadRecordsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def read(self, name, text):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', newline='') as handle:
+            handle.write(text)
+        return list(read_records(path))
+
+    def test_csv_decodes_only_the_genre_lists(self):
+        records = self.read('venues.csv', (
+            'name,genres,seeking_description\n'
+            '[Bracket] Bar,"[""Jazz"", ""Folk""]","[TBD] anything goes"\n'
+            '"[1, 2]",[not json,\n'))
+        self.assertEqual(records, [
+            (2, {'name': '[Bracket] Bar', 'genres': ['Jazz', 'Folk'],
+                 'seeking_description': '[TBD] anything goes'}),
+            (3, {'name': '[1, 2]', 'genres': '[not json',
+                 'seeking_description': ''}),
+        ])
+
+    def test_ndjson(self):
+        records = self.read('artists.ndjson', (
+            '{"name": "[Bracket] Band", "genres": ["Rock"]}\n\n'
+            '{"name": "Solo"}\n'))
+        self.assertEqual(records, [
+            (1, {'name': '[Bracket] Band', 'genres': ['Rock']}),
+            (3, {'name': 'Solo'}),
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,289 @@
+"""SQL statement budgets for every route.
+
+Seeds a small and a larger fixture dataset, requests every route through
+the Flask test client and counts the statements each request runs. A route
+fails when it runs more statements than its budget, or more statements on
+the larger dataset than on the small one (an N+1 query).
+
+    python test_query_budgets.py -v
+
+Runs against an in-memory SQLite database; set TEST_DATABASE_URL to an
+empty Postgres database to run the same checks there (seed() creates the
+pg_trgm extension, so the role needs the right to).
+"""
+import os
+import re
+import unittest
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+import config
+from app import create_app
+from models import db, Artist, Show, Venue
+
+
+class TestConfig(object):
+    pass
+
+
+for name in dir(config):
+    if name.isupper():
+        setattr(TestConfig, name, getattr(config, name))
+TestConfig.SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DATABASE_URL',
+                                                    'sqlite://')
+if TestConfig.SQLALCHEMY_DATABASE_URI.startswith('sqlite'):
+    TestConfig.SQLALCHEMY_ENGINE_OPTIONS = {}
+TestConfig.SQLALCHEMY_BINDS = {}
+TestConfig.SQLALCHEMY_REPLICA_BINDS = []
+TestConfig.WTF_CSRF_ENABLED = False
+# A cache hit would hide the view's statements
+TestConfig.RESPONSE_CACHE_ENABLED = False
+TestConfig.SHOWS_PER_PAGE = 5
+TestConfig.SEARCH_RESULTS_PER_PAGE = 5
+
+SMALL, LARGE = 3, 30
+
+ARTIST_FORM = {'name': 'The Wild Sax Band', 'city': 'San Francisco',
+               'state': 'CA', 'phone': '326-123-5000', 'genres': 'Jazz',
+               'facebook_link': 'https://www.facebook.com/wildsax',
+               'image_link': 'https://example.com/sax.jpg',
+               'website_link': 'https://example.com'}
+VENUE_FORM = dict(ARTIST_FORM, name='The Dueling Pianos Bar',
+                  address='335 Delancey Street')
+TOMORROW = (datetime.now() + timedelta(days=1)).replace(microsecond=0)
+
+# (endpoint, method, path, request options, statement budget), in the order
+# they are requested; writes come after the reads they would disturb.
+ROUTES = [
+    ('main.index', 'GET', '/', {}, 0),
+    ('venues.venues', 'GET', '/venues', {}, 1),
+    ('venues.search_venues', 'GET', '/venues/search?search_term=1', {}, 1),
+    ('venues.search_venues', 'POST', '/venues/search',
+     {'data': {'search_term': 'a'}}, 0),
+    ('venues.autocomplete_venues', 'GET', '/venues/autocomplete?q=ven', {}, 0),
+    ('venues.genre_venues', 'GET', '/venues/genres/Jazz?state=CA', {}, 1),
+    ('venues.show_venue', 'GET', '/venues/1', {}, 3),
+    ('artists.artists', 'GET', '/artists', {}, 1),
+    ('artists.search_artists', 'GET', '/artists/search?search_term=1', {}, 1),
+    ('artists.search_artists', 'POST', '/artists/search',
+     {'data': {'search_term': 'a'}}, 0),
+    ('artists.autocomplete_artists', 'GET', '/artists/autocomplete?q=art',
+     {}, 0),
+    ('artists.genre_artists', 'GET', '/artists/genres/Rock', {}, 1),
+    ('artists.show_artist', 'GET', '/artists/1', {}, 3),
+    ('shows.shows', 'GET', '/shows', {}, 2),
+    ('main.export_data', 'GET', '/export/shows.ndjson', {}, 1),
+    ('main.cache_stats', 'GET', '/cache/stats', {}, 0),
+    ('main.metrics_endpoint', 'GET', '/metrics', {}, 0),
+    ('venues.create_venue_form', 'GET', '/venues/create', {}, 0),
+    ('artists.create_artist_form', 'GET', '/artists/create', {}, 0),
+    ('shows.create_shows', 'GET', '/shows/create', {}, 0),
+    ('venues.edit_venue', 'GET', '/venues/1/edit', {}, 1),
+    ('artists.edit_artist', 'GET', '/artists/1/edit', {}, 1),
+    ('venues.create_venue_submission', 'POST', '/venues/create',
+     {'data': VENUE_FORM}, 2),
+    ('artists.create_artist_submission', 'POST', '/artists/create',
+     {'data': ARTIST_FORM}, 2),
+    ('shows.create_show_submission', 'POST', '/shows/create',
+     {'data': {'artist_id': 1, 'venue_id': 1,
+               'start_time': TOMORROW.strftime('%Y-%m-%d %H:%M:%S')}}, 5),
+    ('shows.create_shows_api', 'POST', '/api/shows',
+     {'json': {'shows': [{'artist_id': 1, 'venue_id': 2,
+                          'start_time': TOMORROW.isoformat()}]}}, 5),
+    ('venues.edit_venue_submission', 'POST', '/venues/1/edit',
+     {'data': VENUE_FORM}, 2),
+    ('artists.edit_artist_submission', 'POST', '/artists/1/edit',
+     {'data': ARTIST_FORM}, 2),
+    ('venues.delete_venue', 'DELETE', '/venues/2', {}, 5),
+    ('artists.delete_artist', 'DELETE', '/artists/2', {}, 5),
+    ('main.deletion_job', 'GET', '/deletions/1', {}, 1),
+]
+
+# Served by Flask or the asset pipeline without touching the database
+UNBUDGETED = {'static', 'built_asset'}
+
+
+def shows_text(*texts):
+    """Check that the response body contains every one of ``texts``."""
+    def check(test, response):
+        body = response.get_data(as_text=True)
+        for text in texts:
+            test.assertIn(text, body)
+    return check
+
+
+def lists_matches(model, term):
+    """Check a search page links each of the first matches of ``term`` once."""
+    def check(test, response):
+        body = response.get_data(as_text=True)
+        ids = re.findall(r'href="/{}s/(\d+)"'.format(model.__tablename__), body)
+        matches = db.session.query(model.id).filter(
+            model.name.contains(term), model.deleted_at.is_(None)).count()
+        test.assertIn(': {}</h3>'.format(matches), body)
+        test.assertEqual(len(ids), len(set(ids)), 'duplicated results')
+        test.assertEqual(len(ids), min(
+            matches, TestConfig.SEARCH_RESULTS_PER_PAGE))
+    return check
+
+
+def stored(model, **values):
+    """Check that a ``model`` row with ``values`` exists afterwards."""
+    def check(test, response):
+        test.assertEqual(db.session.query(model).filter_by(**values).count(),
+                         1, '{} {} not stored'.format(model.__name__, values))
+    return check
+
+
+def deleting(model, entity_id):
+    """Check the deletion job response and that the row is hidden."""
+    def check(test, response):
+        test.assertEqual(response.status_code, 202)
+        test.assertEqual(response.get_json()['entity_id'], entity_id)
+        test.assertIsNotNone(
+            db.session.query(model).get(entity_id).deleted_at)
+    return check
+
+
+# What each route has to get right besides its budget, checked after the
+# request (its statements are not counted)
+CHECKS = {
+    ('venues.venues', 'GET'): shows_text('Venue 1', 'San Francisco'),
+    ('venues.search_venues', 'GET'): lists_matches(Venue, '1'),
+    ('venues.show_venue', 'GET'): shows_text('Venue 1', '1 Main Street'),
+    ('venues.genre_venues', 'GET'): shows_text('Jazz venues in CA'),
+    ('artists.artists', 'GET'): shows_text('Artist 1'),
+    ('artists.search_artists', 'GET'): lists_matches(Artist, '1'),
+    ('artists.show_artist', 'GET'): shows_text('Artist 1'),
+    ('artists.genre_artists', 'GET'): shows_text('Rock artists'),
+    ('shows.shows', 'GET'): shows_text('Artist', 'Venue'),
+    ('main.export_data', 'GET'): shows_text('"venue_id"'),
+    ('venues.edit_venue', 'GET'): shows_text('Venue 1'),
+    ('artists.edit_artist', 'GET'): shows_text('Artist 1'),
+    ('venues.create_venue_submission', 'POST'):
+        stored(Venue, name=VENUE_FORM['name'], address=VENUE_FORM['address']),
+    ('artists.create_artist_submission', 'POST'):
+        stored(Artist, name=ARTIST_FORM['name'], genres=['Jazz']),
+    ('shows.create_show_submission', 'POST'):
+        stored(Show, artist_id=1, venue_id=1, start_time=TOMORROW),
+    ('shows.create_shows_api', 'POST'):
+        stored(Show, artist_id=1, venue_id=2, start_time=TOMORROW),
+    ('venues.edit_venue_submission', 'POST'):
+        stored(Venue, id=1, name=VENUE_FORM['name']),
+    ('artists.edit_artist_submission', 'POST'):
+        stored(Artist, id=1, name=ARTIST_FORM['name']),
+    ('venues.delete_venue', 'DELETE'): deleting(Venue, 2),
+    ('artists.delete_artist', 'DELETE'): deleting(Artist, 2),
+    ('main.deletion_job', 'GET'): shows_text('"entity_id": 2', '"name": "Venue 2"'),
+}
+
+
+def seed(scale):
+    """Fill the database with ``scale`` venues and artists in two cities.
+
+    Every venue gets two past and two upcoming shows with different artists,
+    so each artist plays four shows too.
+    """
+    db.drop_all()
+    if db.engine.dialect.name == 'postgresql':
+        # The trigram name indexes need the extension
+        db.session.execute(db.text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+        db.session.commit()
+    db.create_all()
+    now = datetime.now().replace(microsecond=0)
+    cities = [('San Francisco', 'CA'), ('New York', 'NY')]
+    db.session.add_all([Venue(
+        id=i, name='Venue {}'.format(i), city=cities[i % 2][0],
+        state=cities[i % 2][1], address='{} Main Street'.format(i),
+        genres=['Jazz', 'Folk']) for i in range(1, scale + 1)])
+    db.session.add_all([Artist(
+        id=i, name='Artist {}'.format(i), city=cities[i % 2][0],
+        state=cities[i % 2][1], genres=['Rock']) for i in range(1, scale + 1)])
+    db.session.flush()
+    db.session.add_all([Show(
+        venue_id=venue_id, artist_id=(venue_id + offset) % scale + 1,
+        start_time=now + timedelta(days=offset - 1.5))
+        for venue_id in range(1, scale + 1) for offset in range(4)])
+    db.session.commit()
+    db.session.remove()
+
+
+@contextmanager
+def counting_statements(engine):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'after_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'after_cursor_execute', record)
+
+
+class QueryBudgetTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = create_app(TestConfig)
+
+    def measure(self, scale):
+        """Seed ``scale`` rows and return each route's statements."""
+        with self.app.app_context():
+            seed(scale)
+            engine = db.get_engine()
+        client = self.app.test_client()
+        client.get('/')  # before_first_request builds the name indexes
+        results = []
+        for endpoint, method, path, options, budget in ROUTES:
+            with counting_statements(engine) as statements:
+                response = client.open(path, method=method, **options)
+                response.get_data()  # runs streamed bodies to the end
+                response.close()
+            self.assertLess(response.status_code, 400,
+                            '{} {} returned {}'.format(method, path,
+                                                       response.status_code))
+            check = CHECKS.get((endpoint, method))
+            if check is not None:
+                with self.app.app_context(), self.subTest(
+                        route='{} {}'.format(method, path)):
+                    check(self, response)
+                    db.session.remove()
+            results.append((endpoint, method, path, budget, statements))
+        return results
+
+    def test_routes_stay_within_budget(self):
+        for endpoint, method, path, budget, statements in self.measure(SMALL):
+            with self.subTest(route='{} {}'.format(method, path)):
+                self.assertLessEqual(
+                    len(statements), budget,
+                    '{} {} ran {} statements (budget {}):\n{}'.format(
+                        method, path, len(statements), budget,
+                        '\n'.join(statements)))
+
+    def test_statement_count_does_not_grow_with_rows(self):
+        small = self.measure(SMALL)
+        large = self.measure(LARGE)
+        for (endpoint, method, path, budget, few), (_, _, _, _, many) in zip(
+                small, large):
+            with self.subTest(route='{} {}'.format(method, path)):
+                self.assertEqual(
+                    len(few), len(many),
+                    '{} {} ran {} statements with {} rows and {} with {}'.format(
+                        method, path, len(few), SMALL, len(many), LARGE))
+
+    def test_every_route_has_a_budget(self):
+        budgeted = {(endpoint, method) for endpoint, method, _, _, _ in ROUTES}
+        for rule in self.app.url_map.iter_rules():
+            if rule.endpoint in UNBUDGETED:
+                continue
+            for method in rule.methods - {'HEAD', 'OPTIONS'}:
+                self.assertIn((rule.endpoint, method), budgeted,
+                              'No statement budget for {} {}'.format(
+                                  method, rule.rule))
+
+
+if __name__ == '__main__':
+    unittest.main()
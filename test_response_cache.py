@@ -0,0 +1,66 @@
+"""Invalidation behaviour of the list page response cache.
+
+    python test_response_cache.py -v
+"""
+import unittest
+
+from flask import Flask, stream_with_context
+
+from response_cache import ResponseCache
+
+
+class ResponseCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        app = Flask(__name__)
+        app.secret_key = 'test'
+        self.cache = cache = ResponseCache(app)
+        self.data = ['old']
+        self.write_during_render = False
+
+        def render():
+            page = self.data[0]
+            if self.write_during_render:
+                # Another request commits and invalidates while this one
+                # still holds what it read before the write
+                self.write_during_render = False
+                self.data[0] = 'new'
+                cache.invalidate('venues')
+            return page
+
+        @app.route('/venues')
+        @cache.cached('venues')
+        def venues():
+            return render()
+
+        @app.route('/streamed')
+        @cache.cached('venues')
+        def streamed():
+            return app.response_class(
+                stream_with_context(iter([render()])))
+
+        self.client = app.test_client()
+
+    def get(self, path):
+        return self.client.get(path).get_data(as_text=True)
+
+    def test_invalidate_drops_cached_pages(self):
+        self.assertEqual(self.get('/venues'), 'old')
+        self.data[0] = 'new'
+        self.assertEqual(self.get('/venues'), 'old')
+        self.cache.invalidate('venues')
+        self.assertEqual(self.get('/venues'), 'new')
+
+    def test_render_overlapping_an_invalidation_is_not_stored(self):
+        for path in ('/venues', '/streamed'):
+            with self.subTest(path=path):
+                self.data[0] = 'old'
+                self.cache.invalidate('venues')
+                self.write_during_render = True
+                self.assertEqual(self.get(path), 'old')
+                self.assertEqual(self.get(path), 'new')
+        self.assertEqual(self.cache.stats()['stale'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
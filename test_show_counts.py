@@ -0,0 +1,118 @@
+"""Behaviour of the upcoming/past show counters on venues and artists.
+
+    python test_show_counts.py -v
+"""
+import unittest
+from datetime import datetime, timedelta
+
+import show_counts
+from app import create_app
+from models import db, Artist, Show, Venue
+from shows import bulk_insert_shows
+from test_query_budgets import TestConfig, seed
+
+
+class ShowCountsTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = create_app(TestConfig)
+
+    def setUp(self):
+        self.context = self.app.app_context()
+        self.context.push()
+        seed(3)
+        self.now = datetime.now()
+
+    def tearDown(self):
+        db.session.remove()
+        self.context.pop()
+
+    def counts(self, model, entity_id):
+        """(upcoming, past) of one row, read fresh from the database."""
+        db.session.expire_all()
+        entity = db.session.query(model).get(entity_id)
+        return entity.upcoming_show_count, entity.past_show_count
+
+    def assert_no_drift(self):
+        self.assertEqual(show_counts.check(), {'venue': [], 'artist': []})
+
+    def test_seeded_counters_match_the_shows(self):
+        self.assertEqual(self.counts(Venue, 1), (2, 2))
+        self.assert_no_drift()
+
+    def test_insert_and_delete(self):
+        venue, artist = self.counts(Venue, 1), self.counts(Artist, 1)
+        show = Show(venue_id=1, artist_id=1,
+                    start_time=self.now + timedelta(days=3))
+        db.session.add(show)
+        db.session.commit()
+        self.assertEqual(self.counts(Venue, 1), (venue[0] + 1, venue[1]))
+        self.assertEqual(self.counts(Artist, 1), (artist[0] + 1, artist[1]))
+        db.session.delete(show)
+        db.session.commit()
+        self.assertEqual(self.counts(Venue, 1), venue)
+        self.assertEqual(self.counts(Artist, 1), artist)
+        self.assert_no_drift()
+
+    def test_bulk_insert(self):
+        venue = self.counts(Venue, 2)
+        bulk_insert_shows([{'venue_id': 2, 'artist_id': artist_id,
+                            'start_time': self.now - timedelta(days=5)}
+                           for artist_id in (1, 2, 3)])
+        db.session.commit()
+        self.assertEqual(self.counts(Venue, 2), (venue[0], venue[1] + 3))
+        self.assert_no_drift()
+
+    def test_reassigning_venue_artist_and_time(self):
+        show = db.session.query(Show).filter(
+            Show.venue_id == 1, Show.start_time > self.now).first()
+        old_artist = show.artist_id
+        new_artist = 3 if old_artist != 3 else 2
+        before = {key: self.counts(*key) for key in (
+            (Venue, 1), (Venue, 2), (Artist, old_artist),
+            (Artist, new_artist))}
+        show = db.session.query(Show).get(show.id)
+        show.venue_id = 2
+        show.artist_id = new_artist
+        show.start_time = self.now - timedelta(days=10)
+        db.session.commit()
+        upcoming, past = before[(Venue, 1)]
+        self.assertEqual(self.counts(Venue, 1), (upcoming - 1, past))
+        upcoming, past = before[(Venue, 2)]
+        self.assertEqual(self.counts(Venue, 2), (upcoming, past + 1))
+        upcoming, past = before[(Artist, old_artist)]
+        self.assertEqual(self.counts(Artist, old_artist), (upcoming - 1, past))
+        upcoming, past = before[(Artist, new_artist)]
+        self.assertEqual(self.counts(Artist, new_artist), (upcoming, past + 1))
+        self.assert_no_drift()
+
+    def test_roll_over_moves_started_shows_to_past(self):
+        db.session.add(Show(venue_id=3, artist_id=1,
+                            start_time=self.now + timedelta(hours=1)))
+        db.session.commit()
+        upcoming, past = self.counts(Venue, 3)
+        self.assertEqual(show_counts.roll_over(self.now + timedelta(hours=2)),
+                         1)
+        self.assertEqual(self.counts(Venue, 3), (upcoming - 1, past + 1))
+        # Nothing left between the old and new watermark
+        self.assertEqual(show_counts.roll_over(self.now + timedelta(hours=2)),
+                         0)
+        self.assert_no_drift()
+
+    def test_check_show_counts_repairs_drift(self):
+        db.session.query(Venue).filter(Venue.id == 1).update(
+            {Venue.upcoming_show_count: 40, Venue.past_show_count: 0})
+        db.session.commit()
+        runner = self.app.test_cli_runner()
+        result = runner.invoke(args=['check-show-counts'])
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn('venue 1: upcoming 40 -> 2, past 0 -> 2', result.output)
+        result = runner.invoke(args=['check-show-counts', '--repair'])
+        self.assertEqual(result.exit_code, 0)
+        self.assertEqual(self.counts(Venue, 1), (2, 2))
+        self.assert_no_drift()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+"""Input validation of POST /api/shows.
+
+    python test_shows_api.py -v
+"""
+import unittest
+from datetime import datetime, timedelta
+
+from app import create_app
+from models import db, Show
+from test_query_budgets import TestConfig, seed
+
+START = (datetime.now() + timedelta(days=1)).replace(microsecond=0)
+WEEKLY = {'artist_id': 1, 'venue_id': 1, 'start_time': START.isoformat(),
+          'repeat': 'weekly',
+          'until': (START + timedelta(days=21)).date().isoformat()}
+
+
+class CreateShowsApiTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = create_app(TestConfig)
+
+    def setUp(self):
+        with self.app.app_context():
+            seed(3)
+        self.client = self.app.test_client()
+
+    def show_count(self):
+        with self.app.app_context():
+            count = db.session.query(Show).count()
+            db.session.remove()
+        return count
+
+    def test_bad_bodies_are_rejected(self):
+        before = self.show_count()
+        bodies = [
+            dict(WEEKLY, weekdays=['XX']),
+            dict(WEEKLY, weekdays='FR'),
+            dict(WEEKLY, weekdays=[{'day': 'FR'}]),
+            [WEEKLY],
+            'FR',
+        ]
+        for body in bodies:
+            with self.subTest(body=body):
+                response = self.client.post('/api/shows', json=body)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.get_json())
+        self.assertEqual(self.show_count(), before)
+
+    def test_weekly_recurrence_on_weekdays(self):
+        before = self.show_count()
+        response = self.client.post('/api/shows', json=dict(
+            WEEKLY, weekdays=['MO', 'FR']))
+        self.assertEqual(response.status_code, 201)
+        created = response.get_json()['created']
+        self.assertGreater(created, 0)
+        self.assertEqual(self.show_count(), before + created)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+"""Behaviour of the venue and artist pages around edits.
+
+    python test_views.py -v
+"""
+import unittest
+from datetime import datetime, timedelta
+
+from app import create_app
+from extensions import venue_index
+from models import db, Venue
+from test_query_budgets import ARTIST_FORM, VENUE_FORM, TestConfig, seed
+
+
+class ConditionalGetTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = create_app(TestConfig)
+
+    def setUp(self):
+        with self.app.app_context():
+            seed(3)
+        self.client = self.app.test_client()
+
+    def test_edit_in_the_same_second_changes_the_etag(self):
+        etag = self.client.get('/venues/1').headers['ETag']
+        self.assertEqual(self.client.get(
+            '/venues/1', headers={'If-None-Match': etag}).status_code, 304)
+        self.client.post('/venues/1/edit', data=dict(VENUE_FORM,
+                                                     name='Renamed Venue'))
+        self.client.get('/')  # consumes the flash, which disables 304s
+        response = self.client.get('/venues/1',
+                                   headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'Renamed Venue', response.data)
+
+
+class EditDeletedTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = create_app(TestConfig)
+
+    def setUp(self):
+        with self.app.app_context():
+            seed(3)
+        self.client = self.app.test_client()
+        self.client.get('/')  # builds the name indexes
+
+    def test_editing_a_deleted_or_missing_venue_is_a_404(self):
+        self.assertEqual(self.client.delete('/venues/2').status_code, 202)
+        for venue_id in (2, 99):
+            with self.subTest(venue_id=venue_id):
+                response = self.client.post(
+                    '/venues/{}/edit'.format(venue_id),
+                    data=dict(VENUE_FORM, name='Ghost Venue'))
+                self.assertEqual(response.status_code, 404)
+        self.assertEqual(
+            self.client.get('/venues/autocomplete?q=ghost').get_json(), [])
+
+    def test_editing_a_deleted_artist_is_a_404(self):
+        self.client.delete('/artists/2')
+        response = self.client.post('/artists/2/edit', data=dict(
+            ARTIST_FORM, name='Ghost Artist'))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(
+            self.client.get('/artists/autocomplete?q=ghost').get_json(), [])
+
+
+
+class PastTheLastPageTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = create_app(TestConfig)
+
+    def setUp(self):
+        with self.app.app_context():
+            seed(12)
+        self.client = self.app.test_client()
+
+    def test_total_is_kept_past_the_last_page(self):
+        pages = [
+            ('/venues/search?search_term=Venue&page=9',
+             b'Number of search results for "Venue": 12'),
+            ('/artists/search?search_term=Artist&page=9',
+             b'Number of search results for "Artist": 12'),
+            ('/venues/genres/Jazz?state=NY&page=9', b'Jazz venues in NY: 6'),
+            ('/artists/genres/Rock?page=9', b'Rock artists: 12'),
+        ]
+        for path, heading in pages:
+            with self.subTest(path=path):
+                self.assertIn(heading, self.client.get(path).data)
+
+
+
+class NameIndexRefreshTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = create_app(TestConfig)
+
+    def setUp(self):
+        with self.app.app_context():
+            seed(3)
+        self.client = self.app.test_client()
+
+    def suggestions(self, prefix):
+        return [hit['name'] for hit in self.client.get(
+            '/venues/autocomplete?q=' + prefix).get_json()]
+
+    def test_writes_of_other_workers_show_up_after_the_interval(self):
+        self.assertEqual(self.suggestions('venue 2'), ['Venue 2'])
+        # Writes made by another process leave this one's index alone
+        with self.app.app_context():
+            db.session.query(Venue).filter_by(id=1).update(
+                {Venue.name: 'Renamed Venue'})
+            db.session.query(Venue).filter_by(id=2).update(
+                {Venue.deleted_at: datetime.now()})
+            db.session.add(Venue(name='Imported Venue', city='Austin',
+                                 state='TX', address='1 Congress Avenue'))
+            db.session.commit()
+        self.assertEqual(self.suggestions('venue 2'), ['Venue 2'])
+        venue_index.refreshed_at -= timedelta(
+            seconds=TestConfig.AUTOCOMPLETE_REFRESH_SECONDS)
+        self.assertEqual(self.suggestions('venue 2'), [])
+        self.assertEqual(self.suggestions('venue 1'), [])
+        self.assertEqual(sorted(self.suggestions('venue')),
+                         ['Imported Venue', 'Renamed Venue', 'Venue 3'])
+        self.assertEqual(sorted(self.suggestions('re')), ['Renamed Venue'])
+        self.assertEqual(self.suggestions('imp'), ['Imported Venue'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,230 @@
+from sys import exc_info
+
+from flask import (Blueprint, Response, abort, current_app, flash, jsonify,
+                   make_response, redirect, render_template, request, url_for)
+
+import deletions
+from db_routing import read_only
+from extensions import response_cache, venue_index
+from helpers import (browse_by_genre, not_modified, page_validators,
+                     refresh_name_index, search_by_name, stream_page,
+                     touch_show_partners, with_validators)
+from models import db, Venue
+import queries
+
+bp = Blueprint('venues', __name__)
+
+# forms (WTForms) is imported inside the views that render or validate one,
+# so it stays off the import path of workers and CLI commands.
+
+
+#  Venues
+#  ----------------------------------------------------------------
+
+
+@bp.route('/venues')
+@read_only
+@response_cache.cached('venues')
+def venues():
+    # DONE: replace with real venues data.
+    #       num_upcoming_shows should be aggregated based on number of upcoming shows per venue.
+    rows = db.session.execute(queries.venue_areas_statement()).all()
+    data = queries.group_areas(rows)
+    return stream_page('pages/venues.html', areas=data)
+
+
+@bp.route('/venues/search', methods=['GET', 'POST'])
+@read_only
+def search_venues():
+    # DONE: implement search on artists with partial string search. Ensure it is case-insensitive.
+    # seach for Hop should return "The Musical Hop".
+    # search for "Music" should return "The Musical Hop" and "Park Square Live Music & Coffee"
+    if request.method == 'POST':
+        return redirect(
+            url_for('.search_venues',
+                    search_term=request.form.get('search_term', '')))
+    search_term = request.args.get('search_term', '')
+    response = search_by_name(Venue, search_term,
+                              request.args.get('page', 1, type=int))
+    return render_template('pages/search_venues.html',
+                           results=response,
+                           search_term=search_term)
+
+
+@bp.route('/venues/genres/<genre>')
+@read_only
+def genre_venues(genre):
+    # e.g. /venues/genres/Jazz?state=TX
+    state = request.args.get('state') or None
+    city = request.args.get('city') or None
+    results = browse_by_genre(Venue, genre,
+                              request.args.get('page', 1, type=int), state, city)
+    return render_template('pages/genre_venues.html', results=results,
+                           genre=genre, state=state, city=city)
+
+
+@bp.route('/venues/autocomplete')
+def autocomplete_venues():
+    refresh_name_index(venue_index, Venue)
+    return jsonify(
+        venue_index.search(request.args.get('q', ''),
+                           current_app.config['AUTOCOMPLETE_LIMIT']))
+
+
+@bp.route('/venues/<int:venue_id>')
+@read_only
+def show_venue(venue_id):
+    # shows the venue page with the given venue_id
+    # DONE: replace with real venue data from the venues table, using venue_id
+
+    validators = page_validators(Venue, venue_id)
+    if validators is None:
+        abort(404)
+    if not_modified(*validators):
+        return with_validators(Response(status=304), *validators)
+    venue = db.session.query(Venue).get(venue_id)
+    data = queries.venue_detail(venue, db.session.execute(
+        queries.venue_shows_statement(venue_id)))
+
+    return with_validators(
+        make_response(render_template('pages/show_venue.html', venue=data)),
+        *validators)
+
+
+#  Create Venue
+#  ----------------------------------------------------------------
+
+
+@bp.route('/venues/create', methods=['GET'])
+def create_venue_form():
+    from forms import VenueForm
+    form = VenueForm()
+    return render_template('forms/new_venue.html', form=form)
+
+
+@bp.route('/venues/create', methods=['POST'])
+def create_venue_submission():
+    from forms import VenueForm
+    form = VenueForm()
+    # DONE: insert form data as a new Venue record in the db, instead
+    data = Venue(name=form.name.data,
+                 city=form.city.data,
+                 state=form.state.data,
+                 address=form.address.data,
+                 phone=form.phone.data,
+                 image_link=form.image_link.data,
+                 facebook_link=form.facebook_link.data,
+                 genres=form.genres.data,
+                 seeking_talent=form.seeking_talent.data,
+                 seeking_description=form.seeking_description.data,
+                 website=form.website_link.data)
+    # DONE: modify data to be the data object returned from db insertion
+    try:
+        db.session.add(data)
+        db.session.commit()
+        venue_index.add(data.id, data.name)
+        response_cache.invalidate('venues')
+        # on successful db insert, flash success
+        flash('Venue ' + data.name + '  was successfully listed!')
+    except Exception as e:
+        print(e)
+        # e.g., flash('An error occurred. Venue ' + data.name + ' could not be listed.')
+        flash('An error occurred. Venue ' + data.name +
+              ' could not be listed.')
+        db.session.rollback()
+    finally:
+        db.session.close()
+    return redirect(url_for(".venues"))
+
+
+@bp.route('/venues/<venue_id>', methods=['DELETE'])
+def delete_venue(venue_id):
+    # DONE: Complete this endpoint for taking a venue_id, and using
+    # SQLAlchemy ORM to delete a record. Handle cases where the session commit could fail.
+    # The venue is hidden right away; its shows and row are deleted in the
+    # background (see deletions.py), with progress at the returned Location.
+    try:
+        job = deletions.schedule(Venue, venue_id)
+        data = job and deletions.progress(job)
+        db.session.commit()
+    except:
+        db.session.rollback()
+        print(exc_info())
+        flash("Venue could not be deleted successfully.Try again later")
+        return redirect(url_for('.venues'))
+    finally:
+        db.session.close()
+    if data is None:
+        abort(404)
+    venue_index.remove(data['entity_id'])
+    response_cache.invalidate('venues', 'shows')
+    flash("Venue: " + data['name'] + " is being deleted.")
+    return jsonify(data), 202, {
+        'Location': url_for('main.deletion_job', job_id=data['id'])}
+    # BONUS CHALLENGE: Implement a button to delete a Venue on a Venue Page, have it so that
+    # clicking that button delete it from the db then redirect the user to the homepage
+
+
+#  Update Venue
+#  ----------------------------------------------------------------
+
+
+@bp.route('/venues/<int:venue_id>/edit', methods=['GET'])
+def edit_venue(venue_id):
+    from forms import VenueForm
+    form = VenueForm()
+    venue = Venue.query.get(venue_id)
+    if (venue is None or venue.deleted_at is not None):
+        abort(404)
+    venue_data = venue.__dict__
+    form.name.data = venue_data['name']
+    form.city.data = venue_data['city']
+    form.state.data = venue_data['state']
+    form.phone.data = venue_data['phone']
+    form.address.data = venue_data['address']
+    form.genres.data = venue_data['genres']
+    form.facebook_link.data = venue_data['facebook_link']
+    form.image_link.data = venue_data['image_link']
+    form.website_link.data = venue_data['website']
+    form.seeking_talent.data = venue_data['seeking_talent']
+    form.seeking_description.data = venue_data['seeking_description']
+    # DONE: populate form with values from venue with ID <venue_id>
+    return render_template('forms/edit_venue.html', form=form, venue=venue)
+
+
+@bp.route('/venues/<int:venue_id>/edit', methods=['POST'])
+def edit_venue_submission(venue_id):
+    # DONE: take values from the form submitted, and update existing
+    # venue record with ID <venue_id> using the new attributes
+    from forms import VenueForm
+    form = VenueForm()
+    try:
+        updated = db.session.query(Venue).filter_by(
+            id=venue_id, deleted_at=None).update(
+            dict(name=form.name.data,
+                 city=form.city.data,
+                 state=form.state.data,
+                 phone=form.phone.data,
+                 address=form.address.data,
+                 image_link=form.image_link.data,
+                 facebook_link=form.facebook_link.data,
+                 genres=form.genres.data,
+                 seeking_talent=form.seeking_talent.data,
+                 seeking_description=form.seeking_description.data,
+                 website=form.website_link.data))
+        if updated:
+            touch_show_partners(Venue, venue_id)
+            db.session.commit()
+            venue_index.add(venue_id, form.name.data)
+            response_cache.invalidate('venues', 'shows')
+            flash('Venue edited successfully')
+    except:
+        print(exc_info())
+        flash('An error occurred. Venue could not be edited')
+        db.session.rollback()
+        return redirect(url_for('.show_venue', venue_id=venue_id))
+    finally:
+        db.session.close()
+    if not updated:
+        abort(404)
+    return redirect(url_for('.show_venue', venue_id=venue_id))